@@ -13,6 +13,7 @@ class UploadedPlanAdmin(admin.ModelAdmin):
 @admin.register(ProcessedOutput)
 class ProcessedOutputAdmin(admin.ModelAdmin):
     list_display = ("id", "plan", "status", "created_at", "updated_at")
+    list_select_related = ("plan",)
     list_filter = ("status",)
     ordering = ("-created_at",)
 
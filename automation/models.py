@@ -8,7 +8,7 @@ class UploadedPlan(models.Model):
 
     name = models.CharField(max_length=255, blank=True)
     original_file = models.FileField(upload_to="uploads/")
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
     def __str__(self) -> str:
         return self.name or f"Plan {self.pk}"
@@ -38,7 +38,10 @@ class ProcessedOutput(models.Model):
     )
     output_file = models.FileField(upload_to="outputs/", blank=True, null=True)
     status = models.CharField(
-        max_length=20, choices=STATUS_CHOICES, default=STATUS_PENDING
+        max_length=20,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        db_index=True,
     )
     log = models.TextField(blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -10,21 +10,94 @@ convention:
 """
 
 from pathlib import Path
-from typing import Tuple
+import re
+from typing import Iterator, Optional, Tuple
+
+
+# How many code/value pairs after an entity header we inspect for its layer
+_LAYER_LOOKAHEAD_PAIRS = 60
+
+# Entity header lines (the value after a `0` group code), padding allowed.
+# [^\S\n] is any whitespace except a newline, so a match never spans lines
+_LWPOLYLINE_HEADER = re.compile(rb"\n[^\S\n]*LWPOLYLINE[^\S\n]*(?:\n|\Z)")
+_INSERT_HEADER = re.compile(rb"\n[^\S\n]*INSERT[^\S\n]*(?:\n|\Z)")
 
 
 def detect_rooms_and_doors_from_dxf(path: Path) -> Tuple[int, int]:
     """
-    Parse the DXF file line-by-line and count:
+    Scan the raw DXF bytes and count:
 
     - Rooms: LWPOLYLINE on layer ROOM
     - Doors: INSERT on layer DOOR
 
     This deliberately avoids depending on ezdxf entity structures, so
     issues like a missing `AcDbPolyline` subclass do not break the POC.
+    Entity headers are located with a regex scan over the file buffer and
+    only those entities are inspected for their layer; if nothing is found
+    (e.g. an oddly formatted file) we fall back to the line-by-line walk.
+    """
+
+    data = path.read_bytes()
+
+    room_count = sum(
+        1 for pos in _iter_entity_starts(data, _LWPOLYLINE_HEADER)
+        if _entity_layer(data, pos) == b"ROOM"
+    )
+    door_count = sum(
+        1 for pos in _iter_entity_starts(data, _INSERT_HEADER)
+        if _entity_layer(data, pos) == b"DOOR"
+    )
+
+    if room_count or door_count:
+        return room_count, door_count
+
+    return _detect_rooms_and_doors_linewise(
+        data.decode(errors="ignore").splitlines()
+    )
+
+
+def _iter_entity_starts(data: bytes, header: re.Pattern[bytes]) -> Iterator[int]:
+    """
+    Yield the offset just past each `0 / <entity>` header line in `data`,
+    where `header` is one of the precompiled header patterns above.
+
+    Hits are only accepted when the value sits on its own line (padding
+    around it is allowed, as with `strip()` in the line-by-line walk) and
+    the previous line is the `0` group code, so the same word appearing as
+    some other group's value is ignored.
     """
+    for match in header.finditer(data):
+        pos = match.start()
+        prev_start = data.rfind(b"\n", 0, pos) + 1
+        if data[prev_start:pos].strip() == b"0":
+            yield match.end()
 
-    text = path.read_text(errors="ignore").splitlines()
+
+def _entity_layer(data: bytes, pos: int) -> Optional[bytes]:
+    """
+    Return the first `8` (layer) value of the entity whose group codes
+    start at `pos`, or None if the entity ends before a layer is found.
+    """
+    find = data.find
+    length = len(data)
+    for _ in range(_LAYER_LOOKAHEAD_PAIRS):
+        code_end = find(b"\n", pos)
+        if code_end == -1:
+            return None
+        value_end = find(b"\n", code_end + 1)
+        if value_end == -1:
+            value_end = length
+        code = data[pos:code_end].strip()
+        if code == b"8":
+            return data[code_end + 1:value_end].strip()
+        if code == b"0":
+            return None
+        pos = value_end + 1
+    return None
+
+
+def _detect_rooms_and_doors_linewise(text: list[str]) -> Tuple[int, int]:
+    """Count ROOM polylines and DOOR inserts by walking code/value pairs."""
 
     room_count = 0
     door_count = 0
@@ -54,4 +127,3 @@ def detect_rooms_and_doors_from_dxf(path: Path) -> Tuple[int, int]:
         i += 2
 
     return room_count, door_count
-
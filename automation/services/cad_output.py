@@ -6,20 +6,262 @@ coordinates, rotations, layers, and metadata.
 """
 
 from pathlib import Path
-from typing import Optional
+from typing import Iterator, Optional, Sequence
+import io
+import itertools
 import math
 
 from .geometry_parser import Point3D
 from .placement_validator import Placement
 
 
+# Component type -> block name / layer name used for INSERT entities
+_BLOCK_NAMES = {
+    "SWITCH": "SWITCH_BLOCK",
+    "LIGHT": "LIGHT_BLOCK",
+    "FAN": "FAN_BLOCK",
+    "SOCKET": "SOCKET_BLOCK",
+}
+
+_LAYER_NAMES = {
+    "SWITCH": "ELECTRICAL_SWITCHES",
+    "LIGHT": "ELECTRICAL_LIGHTS",
+    "FAN": "ELECTRICAL_FANS",
+    "SOCKET": "ELECTRICAL_SOCKETS",
+}
+
+# INSERT entity for one placement, as newline-separated code/value lines
+_INSERT_TEMPLATE = (
+    "0\nINSERT\n"
+    "8\n{layer}\n"  # Layer
+    "2\n{block}\n"  # Block name
+    "10\n{x:.6f}\n"  # X
+    "20\n{y:.6f}\n"  # Y
+    "30\n{z:.6f}\n"  # Z
+    "50\n{rotation:.6f}"  # Rotation
+)
+
+_INSERT_METADATA_SUFFIX = "\n100\nAcDbEntity\n100\nAcDbBlockReference"
+
+# Block definition for switch
+_SWITCH_BLOCK_DEF: tuple[str, ...] = (
+    "0",
+    "BLOCK",
+    "2",
+    "SWITCH_BLOCK",
+    "70",
+    "0",
+    "10",
+    "0",
+    "20",
+    "0",
+    "30",
+    "0",
+    "3",
+    "SWITCH_BLOCK",
+    "1",
+    "",
+    "0",
+    "CIRCLE",
+    "8",
+    "0",
+    "10",
+    "0",
+    "20",
+    "0",
+    "40",
+    "50",  # Radius 50mm
+    "0",
+    "LINE",
+    "8",
+    "0",
+    "10",
+    "-30",
+    "20",
+    "0",
+    "11",
+    "30",
+    "21",
+    "0",
+    "0",
+    "ENDBLK",
+)
+
+# Block definition for light
+_LIGHT_BLOCK_DEF: tuple[str, ...] = (
+    "0",
+    "BLOCK",
+    "2",
+    "LIGHT_BLOCK",
+    "70",
+    "0",
+    "10",
+    "0",
+    "20",
+    "0",
+    "30",
+    "0",
+    "3",
+    "LIGHT_BLOCK",
+    "1",
+    "",
+    "0",
+    "CIRCLE",
+    "8",
+    "0",
+    "10",
+    "0",
+    "20",
+    "0",
+    "40",
+    "100",  # Radius 100mm
+    "0",
+    "CIRCLE",
+    "8",
+    "0",
+    "10",
+    "0",
+    "20",
+    "0",
+    "40",
+    "150",  # Outer circle
+    "0",
+    "ENDBLK",
+)
+
+# Block definition for fan
+_FAN_BLOCK_DEF: tuple[str, ...] = (
+    "0",
+    "BLOCK",
+    "2",
+    "FAN_BLOCK",
+    "70",
+    "0",
+    "10",
+    "0",
+    "20",
+    "0",
+    "30",
+    "0",
+    "3",
+    "FAN_BLOCK",
+    "1",
+    "",
+    "0",
+    "CIRCLE",
+    "8",
+    "0",
+    "10",
+    "0",
+    "20",
+    "0",
+    "40",
+    "300",  # Radius 300mm
+    "0",
+    "LINE",
+    "8",
+    "0",
+    "10",
+    "-300",
+    "20",
+    "0",
+    "11",
+    "300",
+    "21",
+    "0",
+    "0",
+    "LINE",
+    "8",
+    "0",
+    "10",
+    "0",
+    "20",
+    "-300",
+    "11",
+    "0",
+    "21",
+    "300",
+    "0",
+    "ENDBLK",
+)
+
+# Block definition for socket
+_SOCKET_BLOCK_DEF: tuple[str, ...] = (
+    "0",
+    "BLOCK",
+    "2",
+    "SOCKET_BLOCK",
+    "70",
+    "0",
+    "10",
+    "0",
+    "20",
+    "0",
+    "30",
+    "0",
+    "3",
+    "SOCKET_BLOCK",
+    "1",
+    "",
+    "0",
+    "RECTANGLE",
+    "8",
+    "0",
+    "10",
+    "-25",
+    "20",
+    "-15",
+    "11",
+    "25",
+    "21",
+    "15",
+    "0",
+    "CIRCLE",
+    "8",
+    "0",
+    "10",
+    "-15",
+    "20",
+    "0",
+    "40",
+    "8",
+    "0",
+    "CIRCLE",
+    "8",
+    "0",
+    "10",
+    "15",
+    "20",
+    "0",
+    "40",
+    "8",
+    "0",
+    "ENDBLK",
+)
+
+_REQUIRED_BLOCKS: dict[str, tuple[str, ...]] = {
+    "SWITCH_BLOCK": _SWITCH_BLOCK_DEF,
+    "LIGHT_BLOCK": _LIGHT_BLOCK_DEF,
+    "FAN_BLOCK": _FAN_BLOCK_DEF,
+    "SOCKET_BLOCK": _SOCKET_BLOCK_DEF,
+}
+
+
 class CADOutputGenerator:
     """Generates CAD output files with electrical component placements."""
 
+    # Number of lines joined per write() call when streaming the output file
+    WRITE_BATCH_LINES = 8192
+
     def __init__(self, input_path: Path):
         self.input_path = input_path
         self.lines: list[str] = []
+        # Whitespace-stripped copy of self.lines used for scanning
+        self._stripped: list[str] = []
         self.placements: list[Placement] = []
+        self._section_index: Optional[dict[str, tuple[int, int]]] = None
+        # (line index, lines to insert before it), applied when writing
+        self._pending_inserts: list[tuple[int, Sequence[str]]] = []
 
     def add_placement(self, placement: Placement) -> None:
         """Add a placement to be written."""
@@ -29,6 +271,9 @@ class CADOutputGenerator:
         """Generate output DXF file with placements."""
         # Read input file
         self.lines = self.input_path.read_text(errors="ignore").splitlines()
+        self._stripped = [line.strip() for line in self.lines]
+        self._section_index = None
+        self._pending_inserts = []
         
         # Ensure block definitions exist
         self._ensure_block_definitions()
@@ -36,43 +281,49 @@ class CADOutputGenerator:
         # Insert placement blocks into ENTITIES section
         self._insert_placements()
         
-        # Write output
-        output_path.write_text("\n".join(self.lines) + "\n", errors="ignore")
+        # Write output in batches so the whole file is never held as one string
+        lines = self._iter_output_lines()
+        with output_path.open("w", errors="ignore") as fh:
+            while True:
+                batch = list(itertools.islice(lines, self.WRITE_BATCH_LINES))
+                if not batch:
+                    break
+                batch.append("")
+                fh.write("\n".join(batch))
+
+    def _iter_output_lines(self) -> Iterator[str]:
+        """Yield input lines with pending inserts spliced in, in file order."""
+        inserts = sorted(self._pending_inserts, key=lambda item: item[0])
+        pieces = []
+        previous = 0
+        for index, payload in inserts:
+            pieces.append(itertools.islice(self.lines, previous, index))
+            pieces.append(payload)
+            previous = index
+        pieces.append(itertools.islice(self.lines, previous, None))
+        return itertools.chain.from_iterable(pieces)
 
     def _ensure_block_definitions(self) -> None:
         """Ensure all required block definitions exist."""
-        required_blocks = {
-            "SWITCH_BLOCK": self._get_switch_block_definition(),
-            "LIGHT_BLOCK": self._get_light_block_definition(),
-            "FAN_BLOCK": self._get_fan_block_definition(),
-            "SOCKET_BLOCK": self._get_socket_block_definition(),
-        }
-        
         # Find BLOCKS section
         blocks_start, blocks_end = self._find_section("BLOCKS")
         if blocks_start is None or blocks_end is None:
             return
         
-        # Check which blocks are missing
+        # Check which blocks are missing, stopping once all are found
         existing_blocks = set()
-        i = blocks_start
-        while i < blocks_end - 1:
-            code = self.lines[i].strip()
-            value = self.lines[i + 1].strip()
+        pairs = iter(self._stripped[blocks_start:blocks_end])
+        for code, value in zip(pairs, pairs):
             if code == "2":  # Block name
                 existing_blocks.add(value.upper())
-            i += 2
+                if existing_blocks >= _REQUIRED_BLOCKS.keys():
+                    return
         
         # Insert missing blocks
-        for block_name, block_def in required_blocks.items():
+        for block_name, block_def in _REQUIRED_BLOCKS.items():
             if block_name not in existing_blocks:
                 # Insert before ENDSEC
-                self.lines = (
-                    self.lines[:blocks_end] +
-                    block_def +
-                    self.lines[blocks_end:]
-                )
-                blocks_end += len(block_def)
+                self._pending_inserts.append((blocks_end, block_def))
 
     def _insert_placements(self) -> None:
         """Insert placement blocks into ENTITIES section."""
@@ -81,290 +332,73 @@ class CADOutputGenerator:
         if entities_start is None or entities_end is None:
             return
         
-        # Generate INSERT entities for each placement
-        new_entities: list[str] = []
+        # Write all INSERT entities into one buffer; it is spliced in as a
+        # single chunk, since the writer joins chunks with newlines.
+        buffer = io.StringIO()
         
         for placement in self.placements:
             block_name = self._get_block_name(placement.component_type)
             if not block_name:
                 continue
             
-            # Create INSERT entity
-            insert_entity = [
-                "0",
-                "INSERT",
-                "8",  # Layer
-                self._get_layer_name(placement.component_type),
-                "2",  # Block name
-                block_name,
-                "10",  # X
-                f"{placement.position.x:.6f}",
-                "20",  # Y
-                f"{placement.position.y:.6f}",
-                "30",  # Z
-                f"{placement.position.z:.6f}",
-                "50",  # Rotation
-                f"{placement.rotation:.6f}",
-            ]
+            if buffer.tell():
+                buffer.write("\n")
+            
+            position = placement.position
+            buffer.write(_INSERT_TEMPLATE.format(
+                layer=self._get_layer_name(placement.component_type),
+                block=block_name,
+                x=position.x,
+                y=position.y,
+                z=position.z,
+                rotation=placement.rotation,
+            ))
             
             # Add metadata as extended data if available
             if placement.metadata:
-                insert_entity.extend([
-                    "100",
-                    "AcDbEntity",
-                    "100",
-                    "AcDbBlockReference",
-                ])
-            
-            new_entities.extend(insert_entity)
+                buffer.write(_INSERT_METADATA_SUFFIX)
         
         # Insert new entities before ENDSEC
-        self.lines = (
-            self.lines[:entities_end] +
-            new_entities +
-            self.lines[entities_end:]
-        )
+        if buffer.tell():
+            self._pending_inserts.append((entities_end, (buffer.getvalue(),)))
 
     def _find_section(self, section_name: str) -> tuple[Optional[int], Optional[int]]:
         """Find start and end indices of a DXF section."""
-        start_idx = None
-        end_idx = None
-        
-        for i in range(len(self.lines) - 3):
-            if (
-                self.lines[i].strip() == "0" and
-                self.lines[i + 1].strip() == "SECTION" and
-                self.lines[i + 2].strip() == "2" and
-                self.lines[i + 3].strip() == section_name
-            ):
-                start_idx = i + 4
-            elif (
-                start_idx is not None and
-                self.lines[i].strip() == "0" and
-                self.lines[i + 1].strip() == "ENDSEC"
-            ):
-                end_idx = i
-                break
-        
-        return (start_idx, end_idx)
+        if self._section_index is None:
+            self._section_index = self._build_section_index()
+        return self._section_index.get(section_name, (None, None))
 
-    def _get_block_name(self, component_type: str) -> str:
-        """Get block name for component type."""
-        mapping = {
-            "SWITCH": "SWITCH_BLOCK",
-            "LIGHT": "LIGHT_BLOCK",
-            "FAN": "FAN_BLOCK",
-            "SOCKET": "SOCKET_BLOCK",
-        }
-        return mapping.get(component_type, "")
+    def _build_section_index(self) -> dict[str, tuple[int, int]]:
+        """
+        Map each section name to its (start, end) line indices in one pass
+        over the pre-stripped lines.
 
-    def _get_layer_name(self, component_type: str) -> str:
-        """Get layer name for component type."""
-        mapping = {
-            "SWITCH": "ELECTRICAL_SWITCHES",
-            "LIGHT": "ELECTRICAL_LIGHTS",
-            "FAN": "ELECTRICAL_FANS",
-            "SOCKET": "ELECTRICAL_SOCKETS",
-        }
-        return mapping.get(component_type, "ELECTRICAL")
+        Start is the first line after the section header, end is the index
+        of the matching `0 / ENDSEC` pair. The first occurrence of a name wins.
+        """
+        index: dict[str, tuple[int, int]] = {}
+        stripped = self._stripped
+        current_name: Optional[str] = None
+        current_start = 0
 
-    def _get_switch_block_definition(self) -> list[str]:
-        """Get block definition for switch."""
-        return [
-            "0",
-            "BLOCK",
-            "2",
-            "SWITCH_BLOCK",
-            "70",
-            "0",
-            "10",
-            "0",
-            "20",
-            "0",
-            "30",
-            "0",
-            "3",
-            "SWITCH_BLOCK",
-            "1",
-            "",
-            "0",
-            "CIRCLE",
-            "8",
-            "0",
-            "10",
-            "0",
-            "20",
-            "0",
-            "40",
-            "50",  # Radius 50mm
-            "0",
-            "LINE",
-            "8",
-            "0",
-            "10",
-            "-30",
-            "20",
-            "0",
-            "11",
-            "30",
-            "21",
-            "0",
-            "0",
-            "ENDBLK",
-        ]
+        for i in range(len(stripped) - 3):
+            if stripped[i] != "0":
+                continue
+            value = stripped[i + 1]
+            if value == "SECTION" and stripped[i + 2] == "2":
+                current_name = stripped[i + 3]
+                current_start = i + 4
+            elif value == "ENDSEC" and current_name is not None:
+                index.setdefault(current_name, (current_start, i))
+                current_name = None
 
-    def _get_light_block_definition(self) -> list[str]:
-        """Get block definition for light."""
-        return [
-            "0",
-            "BLOCK",
-            "2",
-            "LIGHT_BLOCK",
-            "70",
-            "0",
-            "10",
-            "0",
-            "20",
-            "0",
-            "30",
-            "0",
-            "3",
-            "LIGHT_BLOCK",
-            "1",
-            "",
-            "0",
-            "CIRCLE",
-            "8",
-            "0",
-            "10",
-            "0",
-            "20",
-            "0",
-            "40",
-            "100",  # Radius 100mm
-            "0",
-            "CIRCLE",
-            "8",
-            "0",
-            "10",
-            "0",
-            "20",
-            "0",
-            "40",
-            "150",  # Outer circle
-            "0",
-            "ENDBLK",
-        ]
+        return index
 
-    def _get_fan_block_definition(self) -> list[str]:
-        """Get block definition for fan."""
-        return [
-            "0",
-            "BLOCK",
-            "2",
-            "FAN_BLOCK",
-            "70",
-            "0",
-            "10",
-            "0",
-            "20",
-            "0",
-            "30",
-            "0",
-            "3",
-            "FAN_BLOCK",
-            "1",
-            "",
-            "0",
-            "CIRCLE",
-            "8",
-            "0",
-            "10",
-            "0",
-            "20",
-            "0",
-            "40",
-            "300",  # Radius 300mm
-            "0",
-            "LINE",
-            "8",
-            "0",
-            "10",
-            "-300",
-            "20",
-            "0",
-            "11",
-            "300",
-            "21",
-            "0",
-            "0",
-            "LINE",
-            "8",
-            "0",
-            "10",
-            "0",
-            "20",
-            "-300",
-            "11",
-            "0",
-            "21",
-            "300",
-            "0",
-            "ENDBLK",
-        ]
+    def _get_block_name(self, component_type: str) -> str:
+        """Get block name for component type."""
+        return _BLOCK_NAMES.get(component_type, "")
 
-    def _get_socket_block_definition(self) -> list[str]:
-        """Get block definition for socket."""
-        return [
-            "0",
-            "BLOCK",
-            "2",
-            "SOCKET_BLOCK",
-            "70",
-            "0",
-            "10",
-            "0",
-            "20",
-            "0",
-            "30",
-            "0",
-            "3",
-            "SOCKET_BLOCK",
-            "1",
-            "",
-            "0",
-            "RECTANGLE",
-            "8",
-            "0",
-            "10",
-            "-25",
-            "20",
-            "-15",
-            "11",
-            "25",
-            "21",
-            "15",
-            "0",
-            "CIRCLE",
-            "8",
-            "0",
-            "10",
-            "-15",
-            "20",
-            "0",
-            "40",
-            "8",
-            "0",
-            "CIRCLE",
-            "8",
-            "0",
-            "10",
-            "15",
-            "20",
-            "0",
-            "40",
-            "8",
-            "0",
-            "ENDBLK",
-        ]
+    def _get_layer_name(self, component_type: str) -> str:
+        """Get layer name for component type."""
+        return _LAYER_NAMES.get(component_type, "ELECTRICAL")
 
@@ -5,16 +5,75 @@ Coordinates geometry parsing, spatial analysis, placement rules,
 validation, and CAD output generation.
 """
 
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from pathlib import Path
-from typing import Optional
+from types import MappingProxyType
+from typing import Iterable, Iterator, Optional
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
 
-from .geometry_parser import GeometryParser, CADGeometry
+from .geometry_parser import GeometryParser, CADGeometry, Point3D, Room
 from .spatial_analyzer import SpatialAnalyzer
 from .placement_rules import PlacementRules
 from .placement_validator import PlacementValidator, Placement
 from .cad_output import CADOutputGenerator
 
 
+logger = logging.getLogger(__name__)
+
+# Light, fan and socket positions computed for a single room
+RoomPositions = tuple[list[Point3D], list[Point3D], list[Point3D]]
+
+# Placement rules rebuilt once per worker process by _init_room_worker
+_worker_rules: Optional[PlacementRules] = None
+
+# Parsed geometry and its spatial analysis, keyed by a hash of the input
+# file contents, so re-running a plan with different placement options
+# skips parsing. Cached objects are shared between threads: the analyzer
+# is frozen before it is cached, and nothing may mutate the geometry.
+GEOMETRY_CACHE_SIZE = 8
+_geometry_cache: "OrderedDict[str, tuple[CADGeometry, SpatialAnalyzer]]" = OrderedDict()
+_geometry_cache_lock = threading.Lock()
+
+
+def _place_room(
+    rules: PlacementRules,
+    room: Room,
+    lights_per_room: int,
+    fans_per_room: int,
+    sockets_enabled: bool,
+    socket_spacing: Optional[float],
+) -> RoomPositions:
+    """Compute light, fan and socket positions for one room."""
+    light_positions = rules.place_lights_for_room(room, count=lights_per_room)
+    fan_positions = rules.place_fans_for_room(room, count=fans_per_room)
+    socket_positions: list[Point3D] = []
+    if sockets_enabled:
+        socket_positions = rules.place_sockets_for_room(room, spacing=socket_spacing)
+    return light_positions, fan_positions, socket_positions
+
+
+def _init_room_worker(geometry: CADGeometry) -> None:
+    """Build placement rules in a worker process from pickled geometry."""
+    global _worker_rules
+    _worker_rules = PlacementRules(geometry, SpatialAnalyzer(geometry))
+
+
+def _place_room_in_worker(args: tuple) -> RoomPositions:
+    """Worker entry point: place components for the room at the given index."""
+    room_index, lights_per_room, fans_per_room, sockets_enabled, socket_spacing = args
+    room = _worker_rules.geometry.rooms[room_index]
+    return _place_room(
+        _worker_rules, room, lights_per_room, fans_per_room,
+        sockets_enabled, socket_spacing
+    )
+
+
 class ElectricalPlacer:
     """
     Main class for automatic electrical component placement.
@@ -22,17 +81,40 @@ class ElectricalPlacer:
     Performs deterministic, rule-based placement using native CAD geometry.
     """
 
+    # With parallel=True, plans with at least this many rooms compute
+    # per-room placements in a process pool. A room takes about a
+    # millisecond serially while starting a pool and shipping the geometry
+    # to it costs tens of milliseconds, so small plans never pay off.
+    PARALLEL_ROOM_THRESHOLD = 256
+
     def __init__(self, input_path: Path):
         self.input_path = input_path
         self.geometry: Optional[CADGeometry] = None
         self.analyzer: Optional[SpatialAnalyzer] = None
         self.rules: Optional[PlacementRules] = None
         self.validator = PlacementValidator()
+        self._cache_key: Optional[str] = None
 
     def parse_geometry(self) -> CADGeometry:
-        """Parse CAD geometry from input file."""
+        """Parse CAD geometry from input file, reusing cached results."""
+        # Hash in chunks so large drawings are never held in memory whole
+        digest = hashlib.blake2b()
+        with self.input_path.open("rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+        self._cache_key = digest.hexdigest()
+        with _geometry_cache_lock:
+            cached = _geometry_cache.get(self._cache_key)
+            if cached:
+                _geometry_cache.move_to_end(self._cache_key)
+        
+        if cached:
+            self.geometry, self.analyzer = cached
+            return self.geometry
+        
         parser = GeometryParser(self.input_path)
         self.geometry = parser.parse()
+        self.analyzer = None
         return self.geometry
 
     def analyze_spatial(self) -> SpatialAnalyzer:
@@ -40,7 +122,20 @@ class ElectricalPlacer:
         if not self.geometry:
             raise RuntimeError("Geometry must be parsed before spatial analysis")
         
+        # Already set when parse_geometry hit the cache
+        if self.analyzer and self.analyzer.geometry is self.geometry:
+            return self.analyzer
+        
         self.analyzer = SpatialAnalyzer(self.geometry)
+        
+        if self._cache_key:
+            # Build the analyzer's lazy caches up front, so concurrent
+            # users of the cached analyzer only ever read it
+            self.analyzer.freeze()
+            with _geometry_cache_lock:
+                _geometry_cache[self._cache_key] = (self.geometry, self.analyzer)
+                while len(_geometry_cache) > GEOMETRY_CACHE_SIZE:
+                    _geometry_cache.popitem(last=False)
         return self.analyzer
 
     def initialize_placement_rules(self) -> PlacementRules:
@@ -57,136 +152,225 @@ class ElectricalPlacer:
         switches_per_door: int = 1,
         fans_per_room: int = 0,
         sockets_enabled: bool = True,
-        socket_spacing: Optional[float] = None
+        socket_spacing: Optional[float] = None,
+        parallel: bool = False
     ) -> list[Placement]:
         """
         Place electrical components using deterministic rules.
         
+        See iter_placements for the arguments.
+        
+        Returns:
+            List of validated placements
+        """
+        return list(self.iter_placements(
+            lights_per_room=lights_per_room,
+            switches_per_door=switches_per_door,
+            fans_per_room=fans_per_room,
+            sockets_enabled=sockets_enabled,
+            socket_spacing=socket_spacing,
+            parallel=parallel
+        ))
+
+    def iter_placements(
+        self,
+        lights_per_room: int = 1,
+        switches_per_door: int = 1,
+        fans_per_room: int = 0,
+        sockets_enabled: bool = True,
+        socket_spacing: Optional[float] = None,
+        parallel: bool = False
+    ) -> Iterator[Placement]:
+        """
+        Place electrical components, yielding each validated placement.
+        
+        Candidates are generated and validated one at a time, so no list
+        of all candidate placements is built.
+        
         Args:
             lights_per_room: Number of lights per room
             switches_per_door: Number of switches per door
             fans_per_room: Number of fans per room
             sockets_enabled: Whether to place sockets
             socket_spacing: Spacing between sockets (mm), None for default
+            parallel: Allow large plans to be placed in a process pool
         
-        Returns:
-            List of validated placements
+        Yields:
+            Validated placements
         """
         if not self.rules:
             raise RuntimeError("Placement rules must be initialized")
         
-        all_placements: list[Placement] = []
+        candidates = self._iter_candidates(
+            lights_per_room, switches_per_door, fans_per_room,
+            sockets_enabled, socket_spacing, parallel
+        )
+        
+        # Keep only the valid placements
+        # (invalid placements could be added to log output)
+        for placement, result in self.validator.iter_validate(candidates):
+            if result.is_valid:
+                yield placement
+
+    def _iter_candidates(
+        self,
+        lights_per_room: int,
+        switches_per_door: int,
+        fans_per_room: int,
+        sockets_enabled: bool,
+        socket_spacing: Optional[float],
+        parallel: bool
+    ) -> Iterator[Placement]:
+        """Yield unvalidated lights, then switches, fans and sockets."""
+        rooms = self.geometry.rooms
+        doors = self.geometry.doors
+        find_room_for_door = self.analyzer.find_room_for_door
+        place_switches_for_door = self.rules.place_switches_for_door
+        
+        # Rooms are independent, so compute their positions up front
+        room_positions = self._place_rooms(
+            lights_per_room, fans_per_room, sockets_enabled, socket_spacing,
+            parallel=parallel
+        )
+        
+        # Metadata only depends on the room (or door), so one read-only
+        # mapping is shared by all placements of that room/door and type.
         
         # Place lights
-        for room in self.geometry.rooms:
-            light_positions = self.rules.place_lights_for_room(room, count=lights_per_room)
+        for room, (light_positions, _, _) in zip(rooms, room_positions):
+            if not light_positions:
+                continue
+            metadata = MappingProxyType({
+                "room_layer": room.layer,
+                "floor_level": room.floor_level,
+                "rule": "centroid_or_grid"
+            })
             for pos in light_positions:
-                placement = Placement(
-                    position=pos,
-                    component_type="LIGHT",
-                    room=room,
-                    metadata={
-                        "room_layer": room.layer,
-                        "floor_level": room.floor_level,
-                        "rule": "centroid_or_grid"
-                    }
-                )
-                all_placements.append(placement)
+                yield Placement(pos, "LIGHT", room, 0.0, metadata)
         
         # Place switches
-        for door in self.geometry.doors:
-            # Find room for door
-            room = self.analyzer.find_room_for_point(door.position)
-            if not room:
-                # Try to find nearest room
-                for r in self.geometry.rooms:
-                    doors_in_room = self.analyzer.find_doors_for_room(r)
-                    if door in doors_in_room:
-                        room = r
-                        break
+        for door in doors:
+            # Find room for door (containing room, else nearest boundary)
+            room = find_room_for_door(door)
             
             if room:
-                switch_positions = self.rules.place_switches_for_door(
+                switch_positions = place_switches_for_door(
                     door,
                     room,
                     count=switches_per_door
                 )
+                metadata = MappingProxyType({
+                    "door_position": (door.position.x, door.position.y),
+                    "door_rotation": door.rotation,
+                    "height": 1400.0,
+                    "rule": "near_door_on_wall"
+                })
                 for pos in switch_positions:
-                    placement = Placement(
-                        position=pos,
-                        component_type="SWITCH",
-                        room=room,
-                        rotation=door.rotation,
-                        metadata={
-                            "door_position": (door.position.x, door.position.y),
-                            "door_rotation": door.rotation,
-                            "height": 1400.0,
-                            "rule": "near_door_on_wall"
-                        }
-                    )
-                    all_placements.append(placement)
+                    yield Placement(pos, "SWITCH", room, door.rotation, metadata)
         
         # Place fans
-        for room in self.geometry.rooms:
-            fan_positions = self.rules.place_fans_for_room(room, count=fans_per_room)
+        for room, (_, fan_positions, _) in zip(rooms, room_positions):
+            if not fan_positions:
+                continue
+            metadata = MappingProxyType({
+                "room_layer": room.layer,
+                "floor_level": room.floor_level,
+                "rule": "ceiling_center"
+            })
             for pos in fan_positions:
-                placement = Placement(
-                    position=pos,
-                    component_type="FAN",
-                    room=room,
-                    metadata={
-                        "room_layer": room.layer,
-                        "floor_level": room.floor_level,
-                        "rule": "ceiling_center"
-                    }
-                )
-                all_placements.append(placement)
+                yield Placement(pos, "FAN", room, 0.0, metadata)
         
         # Place sockets
         if sockets_enabled:
-            for room in self.geometry.rooms:
-                socket_positions = self.rules.place_sockets_for_room(
-                    room,
-                    spacing=socket_spacing
-                )
+            for room, (_, _, socket_positions) in zip(rooms, room_positions):
+                if not socket_positions:
+                    continue
+                metadata = MappingProxyType({
+                    "room_layer": room.layer,
+                    "floor_level": room.floor_level,
+                    "height": 300.0,
+                    "rule": "along_walls_standard_spacing"
+                })
                 for pos in socket_positions:
-                    placement = Placement(
-                        position=pos,
-                        component_type="SOCKET",
-                        room=room,
-                        metadata={
-                            "room_layer": room.layer,
-                            "floor_level": room.floor_level,
-                            "height": 300.0,
-                            "rule": "along_walls_standard_spacing"
-                        }
-                    )
-                    all_placements.append(placement)
-        
-        # Validate all placements
-        validation_results = self.validator.validate_all(all_placements)
-        
-        # Filter out invalid placements
-        valid_placements = []
-        for placement, result in zip(all_placements, validation_results):
-            if result.is_valid:
-                valid_placements.append(placement)
-            # Log invalid placements (could be added to log output)
+                    yield Placement(pos, "SOCKET", room, 0.0, metadata)
+
+    def _place_rooms(
+        self,
+        lights_per_room: int,
+        fans_per_room: int,
+        sockets_enabled: bool,
+        socket_spacing: Optional[float],
+        parallel: bool = False
+    ) -> list[RoomPositions]:
+        """
+        Compute light, fan and socket positions for every room, in room order.
+        
+        With parallel=True, plans of PARALLEL_ROOM_THRESHOLD rooms or more
+        are spread over a process pool; each worker rebuilds the rules from
+        the pickled geometry once. Inside a daemonic process (such as a
+        Celery prefork worker), or if the pool fails, the rooms are
+        processed serially, as they are by default.
+        """
+        rooms = self.geometry.rooms
+        if sockets_enabled and socket_spacing is None:
+            # Resolve the default once rather than in every room
+            socket_spacing = self.rules.SOCKET_SPACING
+        
+        if (
+            parallel
+            and len(rooms) >= self.PARALLEL_ROOM_THRESHOLD
+            and (os.cpu_count() or 1) > 1
+            # Daemonic processes are not allowed to start children
+            and not multiprocessing.current_process().daemon
+        ):
+            tasks = [
+                (i, lights_per_room, fans_per_room, sockets_enabled, socket_spacing)
+                for i in range(len(rooms))
+            ]
+            try:
+                with ProcessPoolExecutor(
+                    initializer=_init_room_worker,
+                    initargs=(self.geometry,),
+                ) as executor:
+                    chunksize = max(1, len(tasks) // (4 * (os.cpu_count() or 1)))
+                    return list(executor.map(_place_room_in_worker, tasks, chunksize=chunksize))
+            except (BrokenProcessPool, OSError, AssertionError):
+                # The pool could not start (AssertionError comes from a
+                # daemonic parent) or a worker died; the serial loop below
+                # recomputes every room
+                logger.warning(
+                    "Room process pool failed; placing %d rooms serially",
+                    len(rooms), exc_info=True
+                )
         
-        return valid_placements
+        return [
+            _place_room(
+                self.rules, room, lights_per_room, fans_per_room,
+                sockets_enabled, socket_spacing
+            )
+            for room in rooms
+        ]
 
     def generate_output(
         self,
         output_path: Path,
-        placements: list[Placement]
-    ) -> None:
-        """Generate output CAD file with placements."""
+        placements: Iterable[Placement]
+    ) -> Counter:
+        """
+        Generate output CAD file with placements.
+        
+        Returns:
+            Number of placements written per component type
+        """
         generator = CADOutputGenerator(self.input_path)
+        component_counts: Counter = Counter()
         
         for placement in placements:
             generator.add_placement(placement)
+            component_counts[placement.component_type] += 1
         
         generator.generate_output(output_path)
+        return component_counts
 
     def process(
         self,
@@ -195,7 +379,8 @@ class ElectricalPlacer:
         switches_per_door: int = 1,
         fans_per_room: int = 0,
         sockets_enabled: bool = True,
-        socket_spacing: Optional[float] = None
+        socket_spacing: Optional[float] = None,
+        parallel: bool = False
     ) -> dict:
         """
         Complete processing pipeline: parse, analyze, place, validate, output.
@@ -212,17 +397,18 @@ class ElectricalPlacer:
         # Initialize placement rules
         rules = self.initialize_placement_rules()
         
-        # Place components
-        placements = self.place_components(
+        # Place components, streaming them straight into the output
+        placements = self.iter_placements(
             lights_per_room=lights_per_room,
             switches_per_door=switches_per_door,
             fans_per_room=fans_per_room,
             sockets_enabled=sockets_enabled,
-            socket_spacing=socket_spacing
+            socket_spacing=socket_spacing,
+            parallel=parallel
         )
         
         # Generate output
-        self.generate_output(output_path, placements)
+        component_counts = self.generate_output(output_path, placements)
         
         # Compile statistics
         stats = {
@@ -233,12 +419,12 @@ class ElectricalPlacer:
             "floor_levels": len(geometry.floor_levels),
             "is_3d": geometry.is_3d,
             "placements": {
-                "lights": sum(1 for p in placements if p.component_type == "LIGHT"),
-                "switches": sum(1 for p in placements if p.component_type == "SWITCH"),
-                "fans": sum(1 for p in placements if p.component_type == "FAN"),
-                "sockets": sum(1 for p in placements if p.component_type == "SOCKET"),
+                "lights": component_counts["LIGHT"],
+                "switches": component_counts["SWITCH"],
+                "fans": component_counts["FAN"],
+                "sockets": component_counts["SOCKET"],
             },
-            "total_placements": len(placements),
+            "total_placements": sum(component_counts.values()),
         }
         
         return stats
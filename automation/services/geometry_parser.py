@@ -5,26 +5,77 @@ This module parses native CAD entities directly from DWG/DXF files,
 extracting exact coordinates, layer names, and entity metadata.
 """
 
+from functools import lru_cache
 from pathlib import Path
-from typing import NamedTuple, Optional
+from typing import Container, Iterable, Iterator, NamedTuple, Optional
 from dataclasses import dataclass, field
 from enum import Enum
 import math
+import sys
 
 try:
     import ezdxf
+    from ezdxf.addons import iterdxf
     EZDXF_AVAILABLE = True
 except ImportError:
     EZDXF_AVAILABLE = False
 
 try:
-    from shapely.geometry import LineString, Polygon
-    from shapely.ops import polygonize
+    import shapely
     SHAPELY_AVAILABLE = True
 except ImportError:
     SHAPELY_AVAILABLE = False
 
 
+# Entity types that mark a drawing as 3D
+_3D_ENTITY_TYPES = frozenset({"3DPOLYLINE", "3DFACE", "SOLID", "EXTRUDED_SURFACE"})
+
+# Everything the ezdxf parsers inspect; other entities are not decoded
+# when a large file is streamed
+_EZDXF_ENTITY_TYPES = _3D_ENTITY_TYPES | {"LINE", "LWPOLYLINE", "POLYLINE", "INSERT"}
+
+# Layer/block name keywords (matched case-insensitively)
+_ROOM_KEYWORDS = (
+    "ROOM",
+    "SPACE",
+    "AREA",
+    "ZONE",
+    "RM_",
+    "A-AREA",
+    "A-SPACE",
+    "חדר",   # Hebrew: room
+    "מרחב",  # Hebrew: space
+)
+_NON_ROOM_KEYWORDS = (
+    "DOOR",
+    "WINDOW",
+    "WALL",
+    "GRID",
+    "COL",
+    "COLUMN",
+    "STAIR",
+    "CORE",
+    "AXIS",
+    "DIM",
+    "TEXT",
+)
+_WALL_KEYWORDS = ("WALL", "קיר", "מחיצה")  # Hebrew: wall, partition
+_DOOR_KEYWORDS = ("DOOR", "דלת", "פתח")  # Hebrew: door, opening
+_WINDOW_KEYWORDS = ("WINDOW",)
+
+
+@lru_cache(maxsize=1024)
+def _has_keyword(name: str, keywords: tuple[str, ...]) -> bool:
+    """
+    Check if any keyword occurs in the upper-cased name.
+
+    A drawing uses a few dozen layer and block names across thousands
+    of entities, so results are cached per name.
+    """
+    name_upper = name.upper()
+    return any(keyword in name_upper for keyword in keywords)
+
+
 class EntityType(Enum):
     """CAD entity types."""
     ROOM = "ROOM"
@@ -36,7 +87,7 @@ class EntityType(Enum):
     UNKNOWN = "UNKNOWN"
 
 
-@dataclass
+@dataclass(slots=True)
 class Point3D:
     """3D point with X, Y, Z coordinates."""
     x: float
@@ -52,10 +103,17 @@ class Point3D:
         dx = self.x - other.x
         dy = self.y - other.y
         dz = self.z - other.z
-        return math.sqrt(dx * dx + dy * dy + dz * dz)
+        return math.hypot(dx, dy, dz)
 
+    def distance_sq_to(self, other: "Point3D") -> float:
+        """Calculate squared 3D distance to another point (for threshold checks)."""
+        dx = self.x - other.x
+        dy = self.y - other.y
+        dz = self.z - other.z
+        return dx * dx + dy * dy + dz * dz
 
-@dataclass
+
+@dataclass(slots=True)
 class Room:
     """Represents a room as a closed boundary."""
     vertices: list[Point3D]
@@ -88,42 +146,58 @@ class Room:
         ys = [v.y for v in self.vertices]
         return (min(xs), min(ys), max(xs), max(ys))
 
-    def get_area(self) -> float:
-        """Calculate room area using shoelace formula."""
+    def get_signed_area(self) -> float:
+        """Calculate signed room area using shoelace formula (positive if CCW)."""
         if len(self.vertices) < 3:
             return 0.0
         
+        vertices = self.vertices
+        first = vertices[0]
         area = 0.0
-        n = len(self.vertices)
-        for i in range(n):
-            j = (i + 1) % n
-            area += self.vertices[i].x * self.vertices[j].y
-            area -= self.vertices[j].x * self.vertices[i].y
-        return abs(area) / 2.0
+        # Carry the previous vertex's coordinates instead of indexing twice
+        x1, y1 = first.x, first.y
+        for v in vertices[1:]:
+            x2, y2 = v.x, v.y
+            area += x1 * y2
+            area -= x2 * y1
+            x1, y1 = x2, y2
+        # Closing edge back to the first vertex
+        area += x1 * first.y
+        area -= first.x * y1
+        return area / 2.0
+
+    def get_area(self) -> float:
+        """Calculate room area using shoelace formula."""
+        return abs(self.get_signed_area())
+
+    def is_ccw(self) -> bool:
+        """Check if room boundary is wound counter-clockwise."""
+        return self.get_signed_area() > 0
 
     def contains_point_2d(self, point: Point3D) -> bool:
         """Check if 2D point is inside room boundary (ray casting algorithm)."""
         x, y = point.x, point.y
-        vertices_2d = [(v.x, v.y) for v in self.vertices]
-        n = len(vertices_2d)
+        vertices = self.vertices
         inside = False
         
-        p1x, p1y = vertices_2d[0]
-        for i in range(1, n + 1):
-            p2x, p2y = vertices_2d[i % n]
-            if y > min(p1y, p2y):
-                if y <= max(p1y, p2y):
-                    if x <= max(p1x, p2x):
-                        if p1y != p2y:
-                            xinters = (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x
-                        if p1x == p2x or x <= xinters:
-                            inside = not inside
+        # Walk edges (previous vertex -> vertex), starting with the closing
+        # edge, using plain comparisons instead of min()/max() calls
+        last = vertices[-1]
+        p1x, p1y = last.x, last.y
+        for v in vertices:
+            p2x, p2y = v.x, v.y
+            if (p1y < y <= p2y) or (p2y < y <= p1y):
+                if x <= p1x or x <= p2x:
+                    if p1x == p2x:
+                        inside = not inside
+                    elif x <= (y - p1y) * (p2x - p1x) / (p2y - p1y) + p1x:
+                        inside = not inside
             p1x, p1y = p2x, p2y
         
         return inside
 
 
-@dataclass
+@dataclass(slots=True)
 class Wall:
     """Represents a wall segment."""
     start: Point3D
@@ -138,12 +212,13 @@ class Wall:
 
     def get_direction(self) -> tuple[float, float]:
         """Get normalized direction vector (dx, dy)."""
-        length = self.get_length()
-        if length == 0:
-            return (1.0, 0.0)
         dx = self.end.x - self.start.x
         dy = self.end.y - self.start.y
-        return (dx / length, dy / length)
+        length = math.hypot(dx, dy, self.end.z - self.start.z)
+        if length == 0:
+            return (1.0, 0.0)
+        inv_length = 1.0 / length
+        return (dx * inv_length, dy * inv_length)
 
     def get_normal(self) -> tuple[float, float]:
         """Get normalized normal vector (perpendicular to wall)."""
@@ -162,7 +237,7 @@ class Wall:
         
         wall_len_sq = wx * wx + wy * wy
         if wall_len_sq == 0:
-            return math.sqrt(vx * vx + vy * vy)
+            return math.hypot(vx, vy)
         
         # Project point onto wall line
         t = (vx * wx + vy * wy) / wall_len_sq
@@ -173,12 +248,10 @@ class Wall:
         closest_y = self.start.y + t * wy
         
         # Distance
-        dx = point.x - closest_x
-        dy = point.y - closest_y
-        return math.sqrt(dx * dx + dy * dy)
+        return math.hypot(point.x - closest_x, point.y - closest_y)
 
 
-@dataclass
+@dataclass(slots=True)
 class Door:
     """Represents a door as a block insert."""
     position: Point3D
@@ -231,7 +304,7 @@ class Door:
         return (math.cos(theta), math.sin(theta))
 
 
-@dataclass
+@dataclass(slots=True)
 class Window:
     """Represents a window as a block insert or line entity."""
     position: Point3D
@@ -242,7 +315,7 @@ class Window:
     height: Optional[float] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class FloorLevel:
     """Represents a floor/level."""
     elevation: float
@@ -264,9 +337,12 @@ class CADGeometry:
 class GeometryParser:
     """Parser for CAD geometry from DWG/DXF files."""
 
+    # Files at least this large are streamed with ezdxf's iterdxf add-on
+    # instead of being loaded into a full document in memory
+    STREAMING_MIN_BYTES = 64 * 1024 * 1024
+
     def __init__(self, file_path: Path):
         self.file_path = file_path
-        self.lines: list[str] = []
         self.geometry = CADGeometry()
         self.doc = None
 
@@ -280,70 +356,82 @@ class GeometryParser:
                 # Fall back to text parsing if ezdxf fails
                 pass
         
-        # Fallback to text-based parsing
-        self.lines = self.file_path.read_text(errors="ignore").splitlines()
-        
-        # Detect if file contains 3D entities
-        self.geometry.is_3d = self._detect_3d()
-        
-        # Parse entities
-        self._parse_rooms()
-        self._parse_walls()
+        # Fallback to text-based parsing: stream the file once, parsing
+        # rooms, walls, doors and windows (and detecting 3D) as we go
+        with self.file_path.open(errors="ignore") as fh:
+            self._parse_entities(fh)
 
         # If no explicit rooms were found but we do have walls,
         # try to infer room polygons from the wall graph.
         if not self.geometry.rooms and self.geometry.walls:
             self._infer_rooms_from_walls()
 
-        self._parse_doors()
-        self._parse_windows()
         self._parse_floor_levels()
         
         return self.geometry
     
     def _parse_with_ezdxf(self) -> CADGeometry:
         """Parse using ezdxf library for better accuracy."""
-        try:
-            # Try to read as DXF first
-            self.doc = ezdxf.readfile(str(self.file_path))
-        except Exception:
-            # If that fails, try reading as DWG (requires ezdxf with DWG support)
+        if self.file_path.stat().st_size >= self.STREAMING_MIN_BYTES:
             try:
-                self.doc = ezdxf.readfile(str(self.file_path))
+                streamed = iterdxf.opendxf(str(self.file_path))
             except Exception:
-                raise
-        
-        modelspace = self.doc.modelspace()
-        
-        # Detect 3D
-        self.geometry.is_3d = self._detect_3d_ezdxf(modelspace)
-        
-        # Parse rooms (closed polylines on ROOM layer)
-        self._parse_rooms_ezdxf(modelspace)
-        
-        # Parse walls (lines/polylines on WALL layer)
-        self._parse_walls_ezdxf(modelspace)
-        
-        # Parse doors (INSERT blocks on DOOR layer)
-        self._parse_doors_ezdxf(modelspace)
-        
-        # Parse windows (INSERT blocks on WINDOW layer)
-        self._parse_windows_ezdxf(modelspace)
+                # Not a seekable ASCII DXF (e.g. binary DXF or DWG)
+                pass
+            else:
+                try:
+                    # Only decode the entity types the parsers look at
+                    return self._parse_modelspace_ezdxf(
+                        streamed.modelspace(types=_EZDXF_ENTITY_TYPES)
+                    )
+                finally:
+                    streamed.close()
+
+        # DWG input is converted to DXF before it reaches the parser
+        # (see processor.convert_dwg_to_dxf); read errors propagate to
+        # parse(), which falls back to text parsing
+        self.doc = ezdxf.readfile(str(self.file_path))
+        return self._parse_modelspace_ezdxf(self.doc.modelspace())
+
+    def _parse_modelspace_ezdxf(self, modelspace) -> CADGeometry:
+        """
+        Extract geometry from an iterable of ezdxf modelspace entities.
+
+        The entities are walked once and each is handed to the parsers for
+        its type, so a streamed modelspace is only read from disk once.
+        """
+        for entity in modelspace:
+            entity_type = entity.dxftype()
+            
+            # Detect 3D
+            if not self.geometry.is_3d:
+                self.geometry.is_3d = self._is_3d_entity_ezdxf(entity, entity_type)
+            
+            if entity_type in ("LWPOLYLINE", "POLYLINE"):
+                # Parse rooms (closed polylines on ROOM layer)
+                self._parse_room_ezdxf(entity, entity_type)
+            if entity_type in ("LINE", "LWPOLYLINE", "POLYLINE"):
+                # Parse walls (lines/polylines on WALL layer)
+                self._parse_wall_ezdxf(entity, entity_type)
+            elif entity_type == "INSERT":
+                # Parse doors (INSERT blocks on DOOR layer)
+                self._parse_door_ezdxf(entity)
+                # Parse windows (INSERT blocks on WINDOW layer)
+                self._parse_window_ezdxf(entity)
         
         # Parse floor levels
         self._parse_floor_levels()
         
         return self.geometry
     
-    def _detect_3d_ezdxf(self, modelspace) -> bool:
-        """Detect if file contains 3D entities using ezdxf."""
-        for entity in modelspace:
-            if entity.dxftype() in ["3DPOLYLINE", "3DFACE", "SOLID", "EXTRUDED_SURFACE"]:
+    def _is_3d_entity_ezdxf(self, entity, entity_type: str) -> bool:
+        """Check if an ezdxf entity makes the file 3D."""
+        if entity_type in _3D_ENTITY_TYPES:
+            return True
+        # Check if entity has Z coordinates
+        if hasattr(entity, "start") and hasattr(entity.start, "z"):
+            if entity.start.z != 0:
                 return True
-            # Check if entity has Z coordinates
-            if hasattr(entity, "start") and hasattr(entity.start, "z"):
-                if entity.start.z != 0:
-                    return True
         return False
     
     def _is_room_layer(self, layer_name: str) -> bool:
@@ -353,248 +441,235 @@ class GeometryParser:
         This is intentionally generous – many architects use various
         naming conventions for architectural spaces.
         """
-        layer_upper = layer_name.upper()
-        room_keywords = [
-            "ROOM",
-            "SPACE",
-            "AREA",
-            "ZONE",
-            "RM_",
-            "A-AREA",
-            "A-SPACE",
-            "חדר",   # Hebrew: room
-            "מרחב",  # Hebrew: space
-        ]
-        non_room_keywords = [
-            "DOOR",
-            "WINDOW",
-            "WALL",
-            "GRID",
-            "COL",
-            "COLUMN",
-            "STAIR",
-            "CORE",
-            "AXIS",
-            "DIM",
-            "TEXT",
-        ]
-        if any(bad in layer_upper for bad in non_room_keywords):
+        if _has_keyword(layer_name, _NON_ROOM_KEYWORDS):
             return False
-        return any(keyword in layer_upper for keyword in room_keywords)
+        return _has_keyword(layer_name, _ROOM_KEYWORDS)
     
-    def _parse_rooms_ezdxf(self, modelspace) -> None:
-        """Parse rooms using ezdxf - flexible layer detection."""
-        for entity in modelspace:
-            layer_name = entity.dxf.layer.upper()
-            entity_type = entity.dxftype()
-            
-            # Check if it's a potential room entity
-            if entity_type not in ["LWPOLYLINE", "POLYLINE", "LINE", "SPLINE"]:
-                continue
-            
-            # Try to detect rooms: either on ROOM layer OR closed polylines
-            is_room_layer = self._is_room_layer(layer_name)
+    def _parse_room_ezdxf(self, entity, entity_type: str) -> None:
+        """Parse a room from an ezdxf polyline - flexible layer detection."""
+        # Try to detect rooms: either on ROOM layer OR closed polylines
+        is_room_layer = self._is_room_layer(entity.dxf.layer)
+        
+        try:
+            # Get vertices (LWPOLYLINE points are 2D; its z is the elevation)
+            if entity_type == "LWPOLYLINE":
+                vertices = [Point3D(x, y, 0.0) for x, y in entity.vertices()]
+            else:
+                vertices = [
+                    Point3D(loc.x, loc.y, loc.z)
+                    for loc in (vertex.dxf.location for vertex in entity.vertices)
+                ]
             
-            if entity_type in ["LWPOLYLINE", "POLYLINE"]:
-                try:
-                    # Get vertices
-                    vertices = []
-                    if entity_type == "LWPOLYLINE":
-                        for point in entity.vertices():
-                            vertices.append(Point3D(point[0], point[1], point[2] if len(point) > 2 else 0.0))
-                    else:
-                        for vertex in entity.vertices:
-                            vertices.append(Point3D(vertex.dxf.location.x, vertex.dxf.location.y, vertex.dxf.location.z))
+            if len(vertices) >= 3:
+                # Check if closed
+                is_closed = False
+                if hasattr(entity.dxf, "flags"):
+                    is_closed = bool(entity.dxf.flags & 1)
+                
+                # Check if first and last vertices are close (within 10mm)
+                if not is_closed and len(vertices) >= 3:
+                    if vertices[0].distance_sq_to(vertices[-1]) < 100.0:
+                        is_closed = True
+                
+                # Accept if: (1) on room layer OR (2) closed polyline with reasonable area
+                if is_room_layer or (is_closed and len(vertices) >= 4):
+                    # Calculate area to filter out very small shapes
+                    room = Room(
+                        vertices=vertices,
+                        layer=sys.intern(entity.dxf.layer),
+                        floor_level=0.0
+                    )
+                    area = room.get_area()
                     
-                    if len(vertices) >= 3:
-                        # Check if closed
-                        is_closed = False
-                        if hasattr(entity.dxf, "flags"):
-                            is_closed = bool(entity.dxf.flags & 1)
-                        
-                        # Check if first and last vertices are close (within 10mm)
-                        if not is_closed and len(vertices) >= 3:
-                            if vertices[0].distance_to(vertices[-1]) < 10.0:
-                                is_closed = True
-                        
-                        # Accept if: (1) on room layer OR (2) closed polyline with reasonable area
-                        if is_room_layer or (is_closed and len(vertices) >= 4):
-                            # Calculate area to filter out very small shapes
-                            room = Room(
-                                vertices=vertices,
-                                layer=entity.dxf.layer,
-                                floor_level=0.0
-                            )
-                            area = room.get_area()
-                            
-                            # Only add if area is reasonable (at least 1 m² = 1,000,000 mm²)
-                            if area > 1000000.0:  # 1 square meter minimum
-                                floor_level = 0.0
-                                if hasattr(entity.dxf, "elevation"):
-                                    floor_level = entity.dxf.elevation
-                                room.floor_level = floor_level
-                                self.geometry.rooms.append(room)
-                except Exception:
-                    continue
+                    # Only add if area is reasonable (at least 1 m² = 1,000,000 mm²)
+                    if area > 1000000.0:  # 1 square meter minimum
+                        floor_level = 0.0
+                        if hasattr(entity.dxf, "elevation"):
+                            floor_level = entity.dxf.elevation
+                        room.floor_level = floor_level
+                        self.geometry.rooms.append(room)
+        except Exception:
+            return
     
     def _is_wall_layer(self, layer_name: str) -> bool:
         """Check if layer name indicates a wall."""
-        layer_upper = layer_name.upper()
-        wall_keywords = ["WALL", "קיר", "מחיצה"]  # Hebrew: wall, partition
-        return any(keyword in layer_upper for keyword in wall_keywords)
+        return _has_keyword(layer_name, _WALL_KEYWORDS)
     
-    def _parse_walls_ezdxf(self, modelspace) -> None:
-        """Parse walls using ezdxf - flexible detection."""
-        for entity in modelspace:
-            layer_name = entity.dxf.layer.upper()
-            entity_type = entity.dxftype()
-            
-            # Check if it's a wall layer
-            is_wall_layer = self._is_wall_layer(layer_name)
-            
-            if entity_type == "LINE" and is_wall_layer:
-                try:
-                    start = Point3D(
-                        entity.dxf.start.x,
-                        entity.dxf.start.y,
-                        entity.dxf.start.z if hasattr(entity.dxf.start, "z") else 0.0
-                    )
-                    end = Point3D(
-                        entity.dxf.end.x,
-                        entity.dxf.end.y,
-                        entity.dxf.end.z if hasattr(entity.dxf.end, "z") else 0.0
+    def _parse_wall_ezdxf(self, entity, entity_type: str) -> None:
+        """Parse walls from an ezdxf line or polyline - flexible detection."""
+        # Check if it's a wall layer
+        is_wall_layer = self._is_wall_layer(entity.dxf.layer)
+        
+        if entity_type == "LINE" and is_wall_layer:
+            try:
+                start = Point3D(
+                    entity.dxf.start.x,
+                    entity.dxf.start.y,
+                    entity.dxf.start.z if hasattr(entity.dxf.start, "z") else 0.0
+                )
+                end = Point3D(
+                    entity.dxf.end.x,
+                    entity.dxf.end.y,
+                    entity.dxf.end.z if hasattr(entity.dxf.end, "z") else 0.0
+                )
+                # Only add if line has reasonable length (at least 100mm)
+                if start.distance_sq_to(end) > 10000.0:
+                    wall = Wall(
+                        start=start,
+                        end=end,
+                        layer=sys.intern(entity.dxf.layer)
                     )
-                    # Only add if line has reasonable length (at least 100mm)
-                    if start.distance_to(end) > 100.0:
+                    self.geometry.walls.append(wall)
+            except Exception:
+                return
+        elif entity_type in ["LWPOLYLINE", "POLYLINE"] and is_wall_layer:
+            try:
+                # Convert polyline segments to wall segments
+                if entity_type == "LWPOLYLINE":
+                    vertices = [(x, y, 0.0) for x, y in entity.vertices()]
+                else:
+                    vertices = [
+                        (loc.x, loc.y, loc.z)
+                        for loc in (vertex.dxf.location for vertex in entity.vertices)
+                    ]
+                
+                for i in range(len(vertices) - 1):
+                    v1 = vertices[i]
+                    v2 = vertices[i + 1]
+                    # Only add if segment has reasonable length
+                    if math.hypot(v2[0] - v1[0], v2[1] - v1[1]) > 100.0:
                         wall = Wall(
-                            start=start,
-                            end=end,
-                            layer=entity.dxf.layer
+                            start=Point3D(v1[0], v1[1], v1[2]),
+                            end=Point3D(v2[0], v2[1], v2[2]),
+                            layer=sys.intern(entity.dxf.layer)
                         )
                         self.geometry.walls.append(wall)
-                except Exception:
-                    continue
-            elif entity_type in ["LWPOLYLINE", "POLYLINE"] and is_wall_layer:
-                try:
-                    # Convert polyline segments to wall segments
-                    vertices = []
-                    if entity_type == "LWPOLYLINE":
-                        for point in entity.vertices():
-                            vertices.append((point[0], point[1], point[2] if len(point) > 2 else 0.0))
-                    else:
-                        for vertex in entity.vertices:
-                            vertices.append((vertex.dxf.location.x, vertex.dxf.location.y, vertex.dxf.location.z))
-                    
-                    for i in range(len(vertices) - 1):
-                        v1 = vertices[i]
-                        v2 = vertices[i + 1]
-                        # Only add if segment has reasonable length
-                        if math.sqrt((v2[0]-v1[0])**2 + (v2[1]-v1[1])**2) > 100.0:
-                            wall = Wall(
-                                start=Point3D(v1[0], v1[1], v1[2]),
-                                end=Point3D(v2[0], v2[1], v2[2]),
-                                layer=entity.dxf.layer
-                            )
-                            self.geometry.walls.append(wall)
-                except Exception:
-                    continue
+            except Exception:
+                return
     
     def _is_door_layer(self, layer_name: str) -> bool:
         """Check if layer name indicates a door."""
-        layer_upper = layer_name.upper()
-        door_keywords = ["DOOR", "דלת", "פתח"]  # Hebrew: door, opening
-        return any(keyword in layer_upper for keyword in door_keywords)
+        return _has_keyword(layer_name, _DOOR_KEYWORDS)
     
     def _is_door_block(self, block_name: str) -> bool:
         """Check if block name indicates a door."""
-        block_upper = block_name.upper()
-        door_keywords = ["DOOR", "דלת", "פתח"]
-        return any(keyword in block_upper for keyword in door_keywords)
+        return _has_keyword(block_name, _DOOR_KEYWORDS)
     
-    def _parse_doors_ezdxf(self, modelspace) -> None:
-        """Parse doors using ezdxf - flexible detection."""
-        for entity in modelspace:
-            if entity.dxftype() != "INSERT":
-                continue
-            
-            layer_name = entity.dxf.layer.upper()
-            block_name = entity.dxf.name.upper()
-            
-            # Check if it's a door: on DOOR layer OR has door in block name
-            is_door_layer = self._is_door_layer(layer_name)
-            is_door_block = self._is_door_block(block_name)
-            
-            if is_door_layer or is_door_block:
-                try:
-                    insert_point = entity.dxf.insert
-                    rotation = entity.dxf.rotation if hasattr(entity.dxf, "rotation") else 0.0
-                    
-                    # Try to get door width from attributes or block definition
-                    width = None
-                    if hasattr(entity, "attribs"):
-                        for attrib in entity.attribs:
-                            if attrib.dxf.tag.upper() in ["WIDTH", "W", "רוחב"]:
-                                try:
-                                    width = float(attrib.dxf.text)
-                                except ValueError:
-                                    pass
-                    
-                    # If width not found, try to get from block scale
-                    if width is None and hasattr(entity.dxf, "xscale"):
-                        # Sometimes door width is encoded in scale
-                        scale = entity.dxf.xscale
-                        if 0.5 < scale < 2.0:  # Reasonable door width range
-                            width = scale * 1000.0  # Approximate conversion
-                    
-                    door = Door(
-                        position=Point3D(insert_point.x, insert_point.y, insert_point.z if hasattr(insert_point, "z") else 0.0),
-                        rotation=math.degrees(rotation) if rotation else 0.0,
-                        layer=entity.dxf.layer,
-                        block_name=entity.dxf.name,
-                        width=width
-                    )
-                    self.geometry.doors.append(door)
-                except Exception:
-                    continue
+    def _parse_door_ezdxf(self, entity) -> None:
+        """Parse a door from an ezdxf INSERT - flexible detection."""
+        # Check if it's a door: on DOOR layer OR has door in block name
+        # (both checks are case-insensitive)
+        is_door_layer = self._is_door_layer(entity.dxf.layer)
+        is_door_block = self._is_door_block(entity.dxf.name)
+        
+        if is_door_layer or is_door_block:
+            try:
+                insert_point = entity.dxf.insert
+                rotation = entity.dxf.rotation if hasattr(entity.dxf, "rotation") else 0.0
+                
+                # Try to get door width from attributes or block definition
+                width = None
+                if hasattr(entity, "attribs"):
+                    for attrib in entity.attribs:
+                        if attrib.dxf.tag.upper() in ["WIDTH", "W", "רוחב"]:
+                            try:
+                                width = float(attrib.dxf.text)
+                            except ValueError:
+                                pass
+                
+                # If width not found, try to get from block scale
+                if width is None and hasattr(entity.dxf, "xscale"):
+                    # Sometimes door width is encoded in scale
+                    scale = entity.dxf.xscale
+                    if 0.5 < scale < 2.0:  # Reasonable door width range
+                        width = scale * 1000.0  # Approximate conversion
+                
+                door = Door(
+                    position=Point3D(insert_point.x, insert_point.y, insert_point.z if hasattr(insert_point, "z") else 0.0),
+                    rotation=math.degrees(rotation) if rotation else 0.0,
+                    layer=sys.intern(entity.dxf.layer),
+                    block_name=sys.intern(entity.dxf.name),
+                    width=width
+                )
+                self.geometry.doors.append(door)
+            except Exception:
+                return
     
-    def _parse_windows_ezdxf(self, modelspace) -> None:
-        """Parse windows using ezdxf."""
-        for entity in modelspace:
-            layer_name = entity.dxf.layer.upper()
-            if "WINDOW" not in layer_name:
-                continue
+    def _parse_window_ezdxf(self, entity) -> None:
+        """Parse a window from an ezdxf INSERT."""
+        if not _has_keyword(entity.dxf.layer, _WINDOW_KEYWORDS):
+            return
+        
+        try:
+            insert_point = entity.dxf.insert
+            rotation = entity.dxf.rotation if hasattr(entity.dxf, "rotation") else 0.0
+            block_name = sys.intern(entity.dxf.name)
             
-            if entity.dxftype() == "INSERT":
-                try:
-                    insert_point = entity.dxf.insert
-                    rotation = entity.dxf.rotation if hasattr(entity.dxf, "rotation") else 0.0
-                    block_name = entity.dxf.name
-                    
-                    window = Window(
-                        position=Point3D(insert_point.x, insert_point.y, insert_point.z if hasattr(insert_point, "z") else 0.0),
-                        rotation=math.degrees(rotation) if rotation else 0.0,
-                        layer=entity.dxf.layer,
-                        block_name=block_name
-                    )
-                    self.geometry.windows.append(window)
-                except Exception:
-                    continue
-
-    def _detect_3d(self) -> bool:
-        """Detect if file contains 3D entities."""
-        for i, line in enumerate(self.lines):
-            if line.strip() == "0":
-                if i + 1 < len(self.lines):
-                    entity_type = self.lines[i + 1].strip().upper()
-                    if entity_type in ["3DPOLYLINE", "3DFACE", "SOLID", "EXTRUDED_SURFACE"]:
-                        return True
-        return False
+            window = Window(
+                position=Point3D(insert_point.x, insert_point.y, insert_point.z if hasattr(insert_point, "z") else 0.0),
+                rotation=math.degrees(rotation) if rotation else 0.0,
+                layer=sys.intern(entity.dxf.layer),
+                block_name=block_name
+            )
+            self.geometry.windows.append(window)
+        except Exception:
+            return
+
+    def _iter_entities(
+        self,
+        lines: Iterable[str],
+        wanted: Container[str]
+    ) -> Iterator[tuple[str, list[tuple[str, str]]]]:
+        """
+        Yield (entity type, group code/value pairs) for each DXF entity.
 
-    def _parse_rooms(self) -> None:
-        """Parse room entities (closed LWPOLYLINE/POLYLINE on ROOM layer or any closed polyline)."""
-        i = 0
-        current_entity = None
-        current_layer = None
+        Every line is stripped at most once; pairs before the first entity
+        are skipped. Entities whose type is not in `wanted` are yielded
+        with no pairs, and their values are never stripped.
+        """
+        entity_type: Optional[str] = None
+        pairs: list[tuple[str, str]] = []
+        collect = False
+        
+        # Pair consecutive lines; a trailing unpaired line is dropped
+        line_iter = iter(lines)
+        for code, value in zip(line_iter, line_iter):
+            code = code.strip()
+            if code == "0":
+                if entity_type is not None:
+                    yield entity_type, pairs
+                entity_type = value.strip()
+                pairs = []
+                collect = entity_type in wanted
+            elif collect:
+                pairs.append((code, value.strip()))
+        
+        if entity_type is not None:
+            yield entity_type, pairs
+
+    def _parse_entities(self, lines: Iterable[str]) -> None:
+        """Dispatch each entity in the DXF lines to its parser and detect 3D entities."""
+        parsers = {
+            "LWPOLYLINE": self._parse_room,
+            "POLYLINE": self._parse_room,
+            "LINE": self._parse_wall,
+            "INSERT": self._parse_insert,
+        }
+        is_3d = False
+        
+        for entity_type, pairs in self._iter_entities(lines, parsers):
+            if not is_3d and entity_type.upper() in _3D_ENTITY_TYPES:
+                is_3d = True
+            
+            parser = parsers.get(entity_type)
+            if parser:
+                parser(pairs)
+        
+        self.geometry.is_3d = is_3d
+
+    def _parse_room(self, pairs: list[tuple[str, str]]) -> None:
+        """Parse a room (closed LWPOLYLINE/POLYLINE on ROOM layer or any closed polyline)."""
+        layer = None
         vertices: list[Point3D] = []
         pending_x: Optional[float] = None
         pending_y: Optional[float] = None
@@ -602,34 +677,9 @@ class GeometryParser:
         floor_level = 0.0
         is_closed = False
         
-        while i < len(self.lines) - 1:
-            code = self.lines[i].strip()
-            value = self.lines[i + 1].strip()
-            
-            if code == "0":
-                # Finalize previous room
-                if current_entity in ["LWPOLYLINE", "POLYLINE"]:
-                    is_room_layer = current_layer and self._is_room_layer(current_layer)
-                    if len(vertices) >= 3 and (is_room_layer or (is_closed and len(vertices) >= 4)):
-                        room = Room(
-                            vertices=list(vertices),
-                            layer=current_layer or "UNKNOWN",
-                            floor_level=floor_level
-                        )
-                        # Avoid tiny artifacts but be generous on area threshold
-                        if room.get_area() > 1.0:
-                            self.geometry.rooms.append(room)
-                
-                # Start new entity
-                current_entity = value
-                current_layer = None
-                vertices = []
-                pending_x = pending_y = pending_z = None
-                floor_level = 0.0
-                is_closed = False
-            
-            elif code == "8":  # Layer
-                current_layer = value
+        for code, value in pairs:
+            if code == "8":  # Layer
+                layer = sys.intern(value)
             
             elif code == "70":  # Flags (for closed polyline)
                 try:
@@ -644,10 +694,9 @@ class GeometryParser:
                 except ValueError:
                     pass
             
-        # Collect vertices
-        if current_entity in ["LWPOLYLINE", "POLYLINE"]:
+            # Collect vertices
             # Many 2D LWPOLYLINEs only provide 10/20 (X/Y) pairs; Z is optional.
-            if code == "10":  # X
+            elif code == "10":  # X
                 try:
                     pending_x = float(value)
                 except ValueError:
@@ -667,108 +716,76 @@ class GeometryParser:
                     pending_z = float(value)
                 except ValueError:
                     pending_z = None
-            
-            i += 2
         
-        # Finalize last room
-        if current_entity in ["LWPOLYLINE", "POLYLINE"]:
-            is_room_layer = current_layer and self._is_room_layer(current_layer)
-            if len(vertices) >= 3 and (is_room_layer or (is_closed and len(vertices) >= 4)):
-                room = Room(
-                    vertices=list(vertices),
-                    layer=current_layer or "UNKNOWN",
-                    floor_level=floor_level
-                )
-                if room.get_area() > 1.0:
-                    self.geometry.rooms.append(room)
-
-    def _parse_walls(self) -> None:
-        """Parse wall entities (LINE on WALL layer)."""
-        i = 0
-        current_entity = None
-        current_layer = None
+        is_room_layer = layer and self._is_room_layer(layer)
+        if len(vertices) >= 3 and (is_room_layer or (is_closed and len(vertices) >= 4)):
+            room = Room(
+                vertices=vertices,
+                layer=layer or "UNKNOWN",
+                floor_level=floor_level
+            )
+            # Avoid tiny artifacts but be generous on area threshold
+            if room.get_area() > 1.0:
+                self.geometry.rooms.append(room)
+
+    def _parse_wall(self, pairs: list[tuple[str, str]]) -> None:
+        """Parse a wall (LINE on WALL layer)."""
+        layer = None
         start_point: Optional[Point3D] = None
         end_point: Optional[Point3D] = None
         pending_x: Optional[float] = None
         pending_y: Optional[float] = None
         pending_z: Optional[float] = None
         
-        while i < len(self.lines) - 1:
-            code = self.lines[i].strip()
-            value = self.lines[i + 1].strip()
-            
-            if code == "0":
-                # Finalize previous wall
-                if current_entity == "LINE" and current_layer and self._is_wall_layer(current_layer):
-                    if start_point and end_point:
-                        # Only add if line has reasonable length
-                        if start_point.distance_to(end_point) > 100.0:
-                            wall = Wall(
-                                start=start_point,
-                                end=end_point,
-                                layer=current_layer
-                            )
-                            self.geometry.walls.append(wall)
-                
-                # Start new entity
-                current_entity = value
-                current_layer = None
-                start_point = end_point = None
-                pending_x = pending_y = pending_z = None
-            
-            elif code == "8":  # Layer
-                current_layer = value
-            
-            # Collect LINE endpoints
-            if current_entity == "LINE":
-                if code == "10":  # Start X
-                    try:
-                        pending_x = float(value)
-                    except ValueError:
-                        pass
-                elif code == "20":  # Start Y
-                    try:
-                        pending_y = float(value)
-                    except ValueError:
-                        pass
-                elif code == "30":  # Start Z
-                    try:
-                        pending_z = float(value)
-                    except ValueError:
-                        pass
-                    if pending_x is not None and pending_y is not None:
-                        z = pending_z if pending_z is not None else 0.0
-                        start_point = Point3D(pending_x, pending_y, z)
-                        pending_x = pending_y = pending_z = None
-                elif code == "11":  # End X
-                    try:
-                        pending_x = float(value)
-                    except ValueError:
-                        pass
-                elif code == "21":  # End Y
-                    try:
-                        pending_y = float(value)
-                    except ValueError:
-                        pass
-                elif code == "31":  # End Z
-                    try:
-                        pending_z = float(value)
-                    except ValueError:
-                        pass
-                    if pending_x is not None and pending_y is not None:
-                        z = pending_z if pending_z is not None else 0.0
-                        end_point = Point3D(pending_x, pending_y, z)
-                        pending_x = pending_y = pending_z = None
-            
-            i += 2
+        for code, value in pairs:
+            if code == "8":  # Layer
+                layer = sys.intern(value)
+            elif code == "10":  # Start X
+                try:
+                    pending_x = float(value)
+                except ValueError:
+                    pass
+            elif code == "20":  # Start Y
+                try:
+                    pending_y = float(value)
+                except ValueError:
+                    pass
+            elif code == "30":  # Start Z
+                try:
+                    pending_z = float(value)
+                except ValueError:
+                    pass
+                if pending_x is not None and pending_y is not None:
+                    z = pending_z if pending_z is not None else 0.0
+                    start_point = Point3D(pending_x, pending_y, z)
+                    pending_x = pending_y = pending_z = None
+            elif code == "11":  # End X
+                try:
+                    pending_x = float(value)
+                except ValueError:
+                    pass
+            elif code == "21":  # End Y
+                try:
+                    pending_y = float(value)
+                except ValueError:
+                    pass
+            elif code == "31":  # End Z
+                try:
+                    pending_z = float(value)
+                except ValueError:
+                    pass
+                if pending_x is not None and pending_y is not None:
+                    z = pending_z if pending_z is not None else 0.0
+                    end_point = Point3D(pending_x, pending_y, z)
+                    pending_x = pending_y = pending_z = None
         
-        # Finalize last wall
-        if current_entity == "LINE" and current_layer and self._is_wall_layer(current_layer):
-            if start_point and end_point and start_point.distance_to(end_point) > 100.0:
+        if layer and self._is_wall_layer(layer) and start_point and end_point:
+            # Only add if line has reasonable length
+            if start_point.distance_sq_to(end_point) > 10000.0:
                 wall = Wall(
                     start=start_point,
                     end=end_point,
-                    layer=current_layer
+                    layer=layer
                 )
                 self.geometry.walls.append(wall)
 
@@ -789,25 +806,25 @@ class GeometryParser:
         if not self.geometry.walls:
             return
 
-        # Build LineStrings from wall segments (2D only).
-        lines: list[LineString] = []
-        for wall in self.geometry.walls:
-            p1 = (wall.start.x, wall.start.y)
-            p2 = (wall.end.x, wall.end.y)
-            # Skip degenerate segments
-            if p1 == p2:
-                continue
-            lines.append(LineString([p1, p2]))
+        # Wall segments (2D only), skipping degenerate ones
+        segments = [
+            ((wall.start.x, wall.start.y), (wall.end.x, wall.end.y))
+            for wall in self.geometry.walls
+            if wall.start.x != wall.end.x or wall.start.y != wall.end.y
+        ]
 
-        if not lines:
+        if not segments:
             return
 
         try:
-            polys = list(polygonize(lines))
+            # Build all LineStrings in one call, then polygonize them
+            polys = shapely.get_parts(
+                shapely.polygonize(shapely.linestrings(segments))
+            )
         except Exception:
             return
 
-        if not polys:
+        if not len(polys):
             return
 
         # Heuristics:
@@ -816,14 +833,12 @@ class GeometryParser:
         #   are all considered rooms.
         MIN_ROOM_AREA = 1000.0
 
-        for poly in polys:
-            area = poly.area
+        for poly, area in zip(polys, shapely.area(polys)):
             if area < MIN_ROOM_AREA:
                 continue
 
             # Convert polygon exterior to a Room.
-            coords = list(poly.exterior.coords)
-            vertices = [Point3D(x=c[0], y=c[1], z=0.0) for c in coords]
+            vertices = [Point3D(c[0], c[1], 0.0) for c in poly.exterior.coords]
             if len(vertices) < 3:
                 continue
 
@@ -834,129 +849,23 @@ class GeometryParser:
             )
             self.geometry.rooms.append(room)
 
-    def _parse_doors(self) -> None:
-        """Parse door entities (INSERT blocks on DOOR layer or with door in block name)."""
-        i = 0
-        current_entity = None
-        current_layer = None
-        insert_x: Optional[float] = None
-        insert_y: Optional[float] = None
-        insert_z: Optional[float] = None
-        rotation: float = 0.0
-        block_name: str = ""
-        
-        while i < len(self.lines) - 1:
-            code = self.lines[i].strip()
-            value = self.lines[i + 1].strip()
-            
-            if code == "0":
-                # Finalize previous door
-                if current_entity == "INSERT":
-                    is_door_layer = current_layer and self._is_door_layer(current_layer)
-                    is_door_block = self._is_door_block(block_name)
-                    
-                    if (is_door_layer or is_door_block) and insert_x is not None and insert_y is not None:
-                        z = insert_z if insert_z is not None else 0.0
-                        door = Door(
-                            position=Point3D(insert_x, insert_y, z),
-                            rotation=rotation,
-                            layer=current_layer or "UNKNOWN",
-                            block_name=block_name
-                        )
-                        self.geometry.doors.append(door)
-                
-                # Start new entity
-                current_entity = value
-                current_layer = None
-                insert_x = insert_y = insert_z = None
-                rotation = 0.0
-                block_name = ""
-            
-            elif code == "8":  # Layer
-                current_layer = value
-            
-            elif code == "2":  # Block name
-                block_name = value
-            
-            elif code == "10":  # Insert X
-                try:
-                    insert_x = float(value)
-                except ValueError:
-                    pass
-            elif code == "20":  # Insert Y
-                try:
-                    insert_y = float(value)
-                except ValueError:
-                    pass
-            elif code == "30":  # Insert Z
-                try:
-                    insert_z = float(value)
-                except ValueError:
-                    pass
-            elif code == "50":  # Rotation
-                try:
-                    rotation = float(value)
-                except ValueError:
-                    pass
-            
-            i += 2
-        
-        # Finalize last door
-        if current_entity == "INSERT":
-            is_door_layer = current_layer and self._is_door_layer(current_layer)
-            is_door_block = self._is_door_block(block_name)
-            
-            if (is_door_layer or is_door_block) and insert_x is not None and insert_y is not None:
-                z = insert_z if insert_z is not None else 0.0
-                door = Door(
-                    position=Point3D(insert_x, insert_y, z),
-                    rotation=rotation,
-                    layer=current_layer or "UNKNOWN",
-                    block_name=block_name
-                )
-                self.geometry.doors.append(door)
-
-    def _parse_windows(self) -> None:
-        """Parse window entities (INSERT blocks on WINDOW layer)."""
-        i = 0
-        current_entity = None
-        current_layer = None
+    def _parse_insert(self, pairs: list[tuple[str, str]]) -> None:
+        """
+        Parse an INSERT as a door (DOOR layer or door in block name)
+        and/or a window (WINDOW layer).
+        """
+        layer = None
         insert_x: Optional[float] = None
         insert_y: Optional[float] = None
         insert_z: Optional[float] = None
         rotation: float = 0.0
         block_name: str = ""
         
-        while i < len(self.lines) - 1:
-            code = self.lines[i].strip()
-            value = self.lines[i + 1].strip()
-            
-            if code == "0":
-                # Finalize previous window
-                if current_entity == "INSERT" and current_layer and "WINDOW" in current_layer.upper():
-                    if insert_x is not None and insert_y is not None:
-                        z = insert_z if insert_z is not None else 0.0
-                        window = Window(
-                            position=Point3D(insert_x, insert_y, z),
-                            rotation=rotation,
-                            layer=current_layer,
-                            block_name=block_name
-                        )
-                        self.geometry.windows.append(window)
-                
-                # Start new entity
-                current_entity = value
-                current_layer = None
-                insert_x = insert_y = insert_z = None
-                rotation = 0.0
-                block_name = ""
-            
-            elif code == "8":  # Layer
-                current_layer = value
-            
+        for code, value in pairs:
+            if code == "8":  # Layer
+                layer = sys.intern(value)
             elif code == "2":  # Block name
-                block_name = value
-            
+                block_name = sys.intern(value)
             elif code == "10":  # Insert X
                 try:
                     insert_x = float(value)
@@ -977,20 +886,29 @@ class GeometryParser:
                     rotation = float(value)
                 except ValueError:
                     pass
-            
-            i += 2
         
-        # Finalize last window
-        if current_entity == "INSERT" and current_layer and "WINDOW" in current_layer.upper():
-            if insert_x is not None and insert_y is not None:
-                z = insert_z if insert_z is not None else 0.0
-                window = Window(
-                    position=Point3D(insert_x, insert_y, z),
-                    rotation=rotation,
-                    layer=current_layer,
-                    block_name=block_name
-                )
-                self.geometry.windows.append(window)
+        if insert_x is None or insert_y is None:
+            return
+        z = insert_z if insert_z is not None else 0.0
+        
+        is_door_layer = layer and self._is_door_layer(layer)
+        if is_door_layer or self._is_door_block(block_name):
+            door = Door(
+                position=Point3D(insert_x, insert_y, z),
+                rotation=rotation,
+                layer=layer or "UNKNOWN",
+                block_name=block_name
+            )
+            self.geometry.doors.append(door)
+        
+        if layer and _has_keyword(layer, _WINDOW_KEYWORDS):
+            window = Window(
+                position=Point3D(insert_x, insert_y, z),
+                rotation=rotation,
+                layer=layer,
+                block_name=block_name
+            )
+            self.geometry.windows.append(window)
 
     def _parse_floor_levels(self) -> None:
         """Parse floor levels from Z elevations, layers, or groups."""
@@ -1008,14 +926,17 @@ class GeometryParser:
                     # Store layer association
                     layer_to_elevation[room.layer] = room.floor_level
         
+        # Reverse the map once: each elevation keeps its first layer
+        elevation_to_layer: dict[float, str] = {}
+        for layer, elev in layer_to_elevation.items():
+            elevation_to_layer.setdefault(elev, layer)
+        
         # Create floor level objects
         for elevation in sorted(elevations):
-            level = FloorLevel(elevation=elevation)
-            # Find associated layer
-            for layer, elev in layer_to_elevation.items():
-                if elev == elevation:
-                    level.layer = layer
-                    break
+            level = FloorLevel(
+                elevation=elevation,
+                layer=elevation_to_layer.get(elevation)
+            )
             self.geometry.floor_levels.append(level)
         
         # If no levels found, create default ground level
@@ -9,7 +9,7 @@ from typing import Optional
 import math
 
 from .geometry_parser import Room, Wall, Door, Window, Point3D, CADGeometry
-from .spatial_analyzer import SpatialAnalyzer
+from .spatial_analyzer import SpatialAnalyzer, perpendicular_direction
 
 
 class PlacementRules:
@@ -22,6 +22,7 @@ class PlacementRules:
     MIN_CLEARANCE_SWITCH_WINDOW = 300.0  # Minimum clearance from window
     MIN_CLEARANCE_LIGHT_BEAM = 500.0  # Minimum clearance from beams/obstructions
     SOCKET_SPACING = 3000.0  # Standard socket spacing along walls
+    MIN_CLEARANCE_SOCKET_OPENING = 500.0  # Minimum clearance from doors/windows
     MIN_ROOM_AREA_FOR_FAN = 10000000.0  # 10 sqm minimum for fan
 
     def __init__(self, geometry: CADGeometry, analyzer: SpatialAnalyzer):
@@ -50,19 +51,16 @@ class PlacementRules:
         if not nearest_wall:
             # Fallback: determine swing side and place switches
             swing_normal = self.analyzer.get_door_swing_side(door, room)
+            wall_dir = perpendicular_direction(door.rotation)
+            z = self.analyzer.get_floor_level(room) + self.SWITCH_HEIGHT
+            # Offset perpendicular to get on wall surface
+            offset_perp = 10.0  # 10mm inside room
             for i in range(count):
                 # Place switches along the swing side, starting 200mm from door
                 offset_along_wall = 200.0 + i * 300.0  # 200mm from door, 300mm spacing
-                # Offset perpendicular to get on wall surface
-                offset_perp = 10.0  # 10mm inside room
-                
-                # Calculate position
-                door_angle = math.radians(door.rotation)
-                wall_dir = (math.cos(door_angle + math.pi/2), math.sin(door_angle + math.pi/2))
                 
                 x = door.position.x + wall_dir[0] * offset_along_wall + swing_normal[0] * offset_perp
                 y = door.position.y + wall_dir[1] * offset_along_wall + swing_normal[1] * offset_perp
-                z = self.analyzer.get_floor_level(room) + self.SWITCH_HEIGHT
                 placements.append(Point3D(x, y, z))
             return placements
         
@@ -93,8 +91,8 @@ class PlacementRules:
         vec2 = (test_point_2.x - door.position.x, test_point_2.y - door.position.y)
         
         # Normalize vectors
-        len1 = math.sqrt(vec1[0]**2 + vec1[1]**2)
-        len2 = math.sqrt(vec2[0]**2 + vec2[1]**2)
+        len1 = math.hypot(vec1[0], vec1[1])
+        len2 = math.hypot(vec2[0], vec2[1])
         if len1 > 0:
             vec1 = (vec1[0]/len1, vec1[1]/len1)
         if len2 > 0:
@@ -131,7 +129,7 @@ class PlacementRules:
             # Verify placement is on swing side (where door opens)
             # Check that point is in the general direction of swing
             to_switch = (wall_surface_point.x - door.position.x, wall_surface_point.y - door.position.y)
-            to_switch_len = math.sqrt(to_switch[0]**2 + to_switch[1]**2)
+            to_switch_len = math.hypot(to_switch[0], to_switch[1])
             if to_switch_len > 0:
                 to_switch = (to_switch[0]/to_switch_len, to_switch[1]/to_switch_len)
                 swing_alignment = to_switch[0] * swing_normal[0] + to_switch[1] * swing_normal[1]
@@ -297,15 +295,20 @@ class PlacementRules:
         if not walls:
             # Fallback: use all walls
             walls = self.geometry.walls
+        if not walls:
+            # Nothing to mount sockets on
+            return placements
         
-        doors = self.analyzer.find_doors_for_room(room)
-        windows = self.analyzer.find_windows_for_room(room)
+        # Door and window positions sockets must keep clear of; a room has
+        # only a few, so a linear scan beats building a spatial index
+        openings = [door.position for door in self.analyzer.find_doors_for_room(room)]
+        openings.extend(window.position for window in self.analyzer.find_windows_for_room(room))
+        min_clearance_sq = self.MIN_CLEARANCE_SOCKET_OPENING ** 2
         
         floor_level = self.analyzer.get_floor_level(room)
         
         for wall in walls:
             wall_length = wall.get_length()
-            wall_dir = wall.get_direction()
             
             # Calculate number of sockets along this wall
             num_sockets = max(1, int(wall_length / spacing))
@@ -323,22 +326,11 @@ class PlacementRules:
                     floor_level + self.SOCKET_HEIGHT
                 )
                 
-                # Check if placement avoids doors
-                too_close_to_door = False
-                for door in doors:
-                    if door.position.distance_to(socket_point) < 500.0:
-                        too_close_to_door = True
-                        break
-                
-                # Check if placement avoids windows
-                too_close_to_window = False
-                for window in windows:
-                    if window.position.distance_to(socket_point) < 500.0:
-                        too_close_to_window = True
-                        break
-                
                 # Only place if clear of doors and windows
-                if not too_close_to_door and not too_close_to_window:
+                if not any(
+                    opening.distance_sq_to(socket_point) < min_clearance_sq
+                    for opening in openings
+                ):
                     # Place on wall surface (slightly inside room)
                     wall_surface_point = self.analyzer.get_wall_surface_point(
                         wall,
@@ -372,6 +364,5 @@ class PlacementRules:
 
     def _get_door_wall_normal(self, door: Door) -> tuple[float, float]:
         """Get wall normal direction for a door (perpendicular to door rotation)."""
-        theta = math.radians(door.rotation + 90.0)  # Perpendicular to door
-        return (math.cos(theta), math.sin(theta))
+        return perpendicular_direction(door.rotation)
 
@@ -5,20 +5,21 @@ Prevents overlaps, maintains minimum clearances, and ensures
 all placements are within room boundaries.
 """
 
-from typing import NamedTuple, Optional
+from typing import Iterable, Iterator, Mapping, NamedTuple, Optional
 from dataclasses import dataclass
+import math
 
 from .geometry_parser import Point3D, Room
 
 
-@dataclass
+@dataclass(slots=True)
 class Placement:
     """Represents an electrical component placement."""
     position: Point3D
     component_type: str  # "SWITCH", "LIGHT", "FAN", "SOCKET"
     room: Optional[Room] = None
     rotation: float = 0.0
-    metadata: dict = None
+    metadata: Mapping = None  # may be shared between placements, so read-only
 
     def __post_init__(self):
         if self.metadata is None:
@@ -43,6 +44,43 @@ class PlacementValidator:
 
     def __init__(self):
         self.placements: list[Placement] = []
+        # Accepted placements bucketed on a square grid whose cell size is
+        # the largest clearance, so clashes can only come from the 3x3 cells
+        # around a new placement. Values are indices into self.placements.
+        self._grid: dict[tuple[int, int], list[int]] = {}
+        self._cell_size = self._max_clearance()
+
+    def _max_clearance(self) -> float:
+        """Largest clearance required between any two component types."""
+        return max(
+            self.MIN_CLEARANCE_SWITCH_SWITCH,
+            self.MIN_CLEARANCE_LIGHT_LIGHT,
+            self.MIN_CLEARANCE_FAN_FAN,
+            self.MIN_CLEARANCE_SOCKET_SOCKET,
+            self.MIN_CLEARANCE_CROSS_TYPE,
+        )
+
+    def _cell(self, point: Point3D) -> tuple[int, int]:
+        """Grid cell containing a point."""
+        return (
+            math.floor(point.x / self._cell_size),
+            math.floor(point.y / self._cell_size),
+        )
+
+    def _nearby_placements(self, point: Point3D) -> list[Placement]:
+        """Accepted placements that could be within clearance of a point."""
+        cx, cy = self._cell(point)
+        grid = self._grid
+        indices = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                cell = grid.get((cx + dx, cy + dy))
+                if cell:
+                    indices.extend(cell)
+        # Check in insertion order so the first clash reported is unchanged
+        indices.sort()
+        placements = self.placements
+        return [placements[i] for i in indices]
 
     def add_placement(self, placement: Placement) -> ValidationResult:
         """Add a placement and validate it."""
@@ -55,25 +93,37 @@ class PlacementValidator:
                 )
         
         # Check overlaps with existing placements
-        for existing in self.placements:
+        for existing in self._nearby_placements(placement.position):
             result = self._check_clearance(placement, existing)
             if not result.is_valid:
                 return result
         
         # Add if valid
+        self._grid.setdefault(self._cell(placement.position), []).append(
+            len(self.placements)
+        )
         self.placements.append(placement)
         return ValidationResult(True, "Placement valid")
 
     def validate_all(self, placements: list[Placement]) -> list[ValidationResult]:
         """Validate a list of placements."""
-        results = []
+        return [result for _, result in self.iter_validate(placements)]
+
+    def iter_validate(
+        self,
+        placements: Iterable[Placement]
+    ) -> Iterator[tuple[Placement, ValidationResult]]:
+        """
+        Validate placements one at a time, yielding (placement, result) pairs.
+        
+        Resets previously accepted placements, like validate_all.
+        """
         self.placements = []
+        self._grid = {}
+        self._cell_size = self._max_clearance()
         
         for placement in placements:
-            result = self.add_placement(placement)
-            results.append(result)
-        
-        return results
+            yield placement, self.add_placement(placement)
 
     def _check_clearance(
         self,
@@ -8,7 +8,6 @@ from django.core.files import File
 
 from ..models import ProcessedOutput, UploadedPlan
 from .cad_adapters import detect_rooms_and_doors_from_dxf
-from .electrical_placer import ElectricalPlacer
 
 
 def convert_dwg_to_dxf(dwg_path: Path, dxf_path: Path) -> None:
@@ -412,6 +411,7 @@ def process_plan(
     sockets_enabled: bool = True,
     socket_spacing: float | None = None,
     use_legacy_mode: bool = False,
+    parallel: bool = False,
 ) -> ProcessedOutput:
     """
     Apply deterministic, rule-based electrical component placement to CAD plans.
@@ -428,6 +428,7 @@ def process_plan(
         sockets_enabled: Whether to place sockets/outlets
         socket_spacing: Spacing between sockets in mm (None for default 3000mm)
         use_legacy_mode: Use old simple placement logic (for backward compatibility)
+        parallel: Allow large plans to place rooms in a process pool
 
     Returns:
         Updated ProcessedOutput instance
@@ -467,8 +468,12 @@ def process_plan(
                 lights_per_room, switches_per_door, fans_per_room
             )
 
-        # Use new comprehensive placement system
+        # Use new comprehensive placement system. Imported here because it
+        # loads ezdxf and shapely, which would otherwise slow down startup
+        # of every process that imports the views.
         try:
+            from .electrical_placer import ElectricalPlacer
+
             placer = ElectricalPlacer(input_path)
             
             # Generate output path
@@ -483,7 +488,8 @@ def process_plan(
                 switches_per_door=switches_per_door,
                 fans_per_room=fans_per_room,
                 sockets_enabled=sockets_enabled,
-                socket_spacing=socket_spacing
+                socket_spacing=socket_spacing,
+                parallel=parallel
             )
             
             # Persist processed DXF via Django's storage backend
@@ -5,27 +5,120 @@ Identifies spatial relationships between rooms, walls, doors, windows,
 and floor levels to support electrical component placement.
 """
 
+from functools import lru_cache
 from typing import Optional
 import math
 
+try:
+    import shapely
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+
 from .geometry_parser import (
     Room, Wall, Door, Window, FloorLevel, CADGeometry, Point3D
 )
 
 
+@lru_cache(maxsize=1024)
+def perpendicular_direction(rotation: float) -> tuple[float, float]:
+    """Unit vector at rotation + 90 degrees, cached per distinct door rotation."""
+    theta = math.radians(rotation + 90.0)
+    return (math.cos(theta), math.sin(theta))
+
+
 class SpatialAnalyzer:
     """Analyzes spatial relationships in CAD geometry."""
 
+    # Below this many rooms a linear scan is cheaper than the bbox index
+    ROOM_INDEX_MIN_ROOMS = 16
+    # Doors within this distance (mm) of a room boundary belong to the room
+    DOOR_ROOM_TOLERANCE = 500.0
+    # Below this many walls a linear scan is cheaper than the wall index
+    WALL_INDEX_MIN_WALLS = 32
+    # Slack (mm) on the indexed nearest distance, so walls that tie under
+    # the exact distance formula are all rechecked
+    WALL_NEAREST_SLACK = 1.0
+
     def __init__(self, geometry: CADGeometry):
         self.geometry = geometry
+        # STRtree over room bounding boxes, built on first use
+        self._room_tree = None
+        # STRtree over wall segments, built on first use
+        self._wall_tree = None
+        # id(door) -> (door, room), built on first find_room_for_door call
+        self._door_to_room: Optional[dict[int, tuple[Door, Room]]] = None
+        # id(room) -> (room, doors of that room), filled by
+        # find_doors_for_room; the room is kept so a recycled id of a
+        # garbage-collected caller Room is never mistaken for a hit
+        self._doors_by_room: dict[int, tuple[Room, list[Door]]] = {}
+        # id(room) -> (room, windows inside that room), filled by
+        # find_windows_for_room; identity-checked like _doors_by_room
+        self._windows_by_room: dict[int, tuple[Room, list[Window]]] = {}
+        # Set by freeze(); no cache is written afterwards
+        self._frozen = False
+
+    def freeze(self) -> None:
+        """
+        Build every index and per-room cache now and stop caching later.
+
+        A frozen analyzer is only read, so it can be shared between
+        threads; lookups for rooms outside the geometry are still answered
+        but no longer cached.
+        """
+        rooms = self.geometry.rooms
+        if SHAPELY_AVAILABLE:
+            if len(rooms) >= self.ROOM_INDEX_MIN_ROOMS:
+                self._get_room_tree()
+            if len(self.geometry.walls) >= self.WALL_INDEX_MIN_WALLS:
+                self._get_wall_tree()
+        if self._door_to_room is None:
+            self._door_to_room = self.map_doors_to_rooms()
+        for room in rooms:
+            self.find_doors_for_room(room)
+            self.find_windows_for_room(room)
+        self._frozen = True
 
     def find_room_for_point(self, point: Point3D) -> Optional[Room]:
         """Find the room containing a given point."""
-        for room in self.geometry.rooms:
+        for room in self._room_candidates(point):
             if room.contains_point_2d(point):
                 return room
         return None
 
+    def _room_candidates(self, point: Point3D, margin: float = 0.0) -> list[Room]:
+        """
+        Rooms whose bounding box, grown by `margin`, contains the point,
+        in geometry order.
+
+        A point outside a room's bounding box can never pass the ray-casting
+        test (nor be closer than `margin` to its boundary), so only these
+        candidates need the exact check. Keeping geometry order means the
+        first match is the same as with a full scan.
+        """
+        rooms = self.geometry.rooms
+        if not SHAPELY_AVAILABLE or len(rooms) < self.ROOM_INDEX_MIN_ROOMS:
+            return rooms
+
+        if margin:
+            probe = shapely.box(
+                point.x - margin, point.y - margin,
+                point.x + margin, point.y + margin,
+            )
+        else:
+            probe = shapely.Point(point.x, point.y)
+        hits = self._get_room_tree().query(probe)
+        return [rooms[i] for i in sorted(hits.tolist())]
+
+    def _get_room_tree(self):
+        """STRtree over room bounding boxes, built on first use."""
+        if self._room_tree is None:
+            bounds = [room.get_bounds() for room in self.geometry.rooms]
+            self._room_tree = shapely.STRtree(
+                shapely.box(*zip(*bounds)), node_capacity=16
+            )
+        return self._room_tree
+
     def find_nearest_wall(self, point: Point3D) -> Optional[Wall]:
         """Find the nearest wall to a given point."""
         if not self.geometry.walls:
@@ -34,7 +127,7 @@ class SpatialAnalyzer:
         nearest_wall = None
         min_distance = float('inf')
         
-        for wall in self.geometry.walls:
+        for wall in self._nearest_wall_candidates(point):
             distance = wall.distance_to_point(point)
             if distance < min_distance:
                 min_distance = distance
@@ -42,26 +135,126 @@ class SpatialAnalyzer:
         
         return nearest_wall
 
+    def _nearest_wall_candidates(self, point: Point3D) -> list[Wall]:
+        """
+        Walls that may be nearest to the point, in geometry order.
+
+        The index finds the nearest distance; every wall within that
+        distance plus WALL_NEAREST_SLACK is returned so the exact check
+        picks the same (first) nearest wall as a full scan.
+        """
+        walls = self.geometry.walls
+        if not SHAPELY_AVAILABLE or len(walls) < self.WALL_INDEX_MIN_WALLS:
+            return walls
+
+        wall_tree = self._get_wall_tree()
+        probe = shapely.Point(point.x, point.y)
+        _, distances = wall_tree.query_nearest(probe, return_distance=True)
+        if not len(distances):
+            return walls
+        hits = wall_tree.query(
+            probe,
+            predicate="dwithin",
+            distance=float(distances[0]) + self.WALL_NEAREST_SLACK,
+        )
+        return [walls[i] for i in sorted(hits.tolist())]
+
+    def _get_wall_tree(self):
+        """STRtree over wall segments, built on first use."""
+        if self._wall_tree is None:
+            self._wall_tree = shapely.STRtree(
+                shapely.linestrings([
+                    [(wall.start.x, wall.start.y), (wall.end.x, wall.end.y)]
+                    for wall in self.geometry.walls
+                ]),
+                node_capacity=16,
+            )
+        return self._wall_tree
+
     def find_doors_for_room(self, room: Room) -> list[Door]:
-        """Find all doors associated with a room."""
-        doors = []
-        for door in self.geometry.doors:
-            # Check if door is near room boundary or inside room
-            if room.contains_point_2d(door.position):
-                doors.append(door)
-            else:
-                # Check if door is near room boundary (within 500mm)
-                min_dist_to_boundary = self._distance_to_room_boundary(room, door.position)
-                if min_dist_to_boundary < 500.0:
-                    doors.append(door)
+        """Find all doors associated with a room (cached per room)."""
+        cached = self._doors_by_room.get(id(room))
+        if cached is not None and cached[0] is room:
+            return cached[1]
+        
+        # A door outside the room's bounding box grown by the tolerance
+        # can be neither inside the room nor near its boundary
+        min_x, min_y, max_x, max_y = room.get_bounds()
+        tolerance = self.DOOR_ROOM_TOLERANCE
+        min_x -= tolerance
+        min_y -= tolerance
+        max_x += tolerance
+        max_y += tolerance
+        doors = [
+            door for door in self.geometry.doors
+            if min_x <= door.position.x <= max_x
+            and min_y <= door.position.y <= max_y
+            and self._is_door_of_room(room, door)
+        ]
+        if not self._frozen:
+            self._doors_by_room[id(room)] = (room, doors)
         return doors
 
+    def _is_door_of_room(self, room: Room, door: Door) -> bool:
+        """Check if door is inside the room or near its boundary."""
+        if room.contains_point_2d(door.position):
+            return True
+        min_dist_to_boundary = self._distance_to_room_boundary(room, door.position)
+        return min_dist_to_boundary < self.DOOR_ROOM_TOLERANCE
+
+    def find_room_for_door(self, door: Door) -> Optional[Room]:
+        """
+        Find the room a door belongs to.
+
+        The room containing the door wins; otherwise the first room whose
+        boundary is within DOOR_ROOM_TOLERANCE. All doors are resolved on
+        the first call and cached.
+        """
+        if self._door_to_room is None:
+            self._door_to_room = self.map_doors_to_rooms()
+        cached = self._door_to_room.get(id(door))
+        if cached is not None and cached[0] is door:
+            return cached[1]
+        return None
+
+    def map_doors_to_rooms(self) -> dict[int, tuple[Door, Room]]:
+        """
+        Map each door to its room, as described in find_room_for_door.
+
+        Keyed by id(door); the door is stored alongside its room so lookups
+        can reject a different Door object that happens to reuse the id.
+        """
+        door_to_room: dict[int, tuple[Door, Room]] = {}
+        for door in self.geometry.doors:
+            room = self.find_room_for_point(door.position)
+            if room is None:
+                candidates = self._room_candidates(
+                    door.position, margin=self.DOOR_ROOM_TOLERANCE
+                )
+                room = next(
+                    (r for r in candidates if self._is_door_of_room(r, door)),
+                    None,
+                )
+            if room is not None:
+                door_to_room[id(door)] = (door, room)
+        return door_to_room
+
     def find_windows_for_room(self, room: Room) -> list[Window]:
-        """Find all windows associated with a room."""
-        windows = []
-        for window in self.geometry.windows:
-            if room.contains_point_2d(window.position):
-                windows.append(window)
+        """Find all windows associated with a room (cached per room)."""
+        cached = self._windows_by_room.get(id(room))
+        if cached is not None and cached[0] is room:
+            return cached[1]
+        
+        # Windows outside the room's bounding box cannot be inside it
+        min_x, min_y, max_x, max_y = room.get_bounds()
+        windows = [
+            window for window in self.geometry.windows
+            if min_x <= window.position.x <= max_x
+            and min_y <= window.position.y <= max_y
+            and room.contains_point_2d(window.position)
+        ]
+        if not self._frozen:
+            self._windows_by_room[id(room)] = (room, windows)
         return windows
 
     def find_walls_for_room(self, room: Room) -> list[Wall]:
@@ -77,20 +270,12 @@ class SpatialAnalyzer:
             # Find walls that match this segment
             for wall in self.geometry.walls:
                 # Check if wall endpoints are close to room vertices
-                dist1_to_start = math.sqrt(
-                    (wall.start.x - v1.x) ** 2 + (wall.start.y - v1.y) ** 2
-                )
-                dist2_to_end = math.sqrt(
-                    (wall.end.x - v2.x) ** 2 + (wall.end.y - v2.y) ** 2
-                )
+                dist1_to_start = math.hypot(wall.start.x - v1.x, wall.start.y - v1.y)
+                dist2_to_end = math.hypot(wall.end.x - v2.x, wall.end.y - v2.y)
                 
                 # Also check reverse direction
-                dist1_to_end = math.sqrt(
-                    (wall.end.x - v1.x) ** 2 + (wall.end.y - v1.y) ** 2
-                )
-                dist2_to_start = math.sqrt(
-                    (wall.start.x - v2.x) ** 2 + (wall.start.y - v2.y) ** 2
-                )
+                dist1_to_end = math.hypot(wall.end.x - v1.x, wall.end.y - v1.y)
+                dist2_to_start = math.hypot(wall.start.x - v2.x, wall.start.y - v2.y)
                 
                 # If wall aligns with room boundary (within 100mm tolerance)
                 tolerance = 100.0
@@ -129,8 +314,7 @@ class SpatialAnalyzer:
             offset_from_wall: Offset perpendicular to wall (positive = inside room)
             height: Height from floor level (default 1400mm for switches)
         """
-        # Calculate position along wall
-        wall_dir = wall.get_direction()
+        # Perpendicular used for the offset
         wall_normal = wall.get_normal()
         
         # Project point onto wall line
@@ -205,15 +389,13 @@ class SpatialAnalyzer:
             
             wall_len_sq = wx * wx + wy * wy
             if wall_len_sq == 0:
-                dist = math.sqrt(vx * vx + vy * vy)
+                dist = math.hypot(vx, vy)
             else:
                 t = (vx * wx + vy * wy) / wall_len_sq
                 t = max(0, min(1, t))
                 closest_x = v1.x + t * wx
                 closest_y = v1.y + t * wy
-                dist = math.sqrt(
-                    (point.x - closest_x) ** 2 + (point.y - closest_y) ** 2
-                )
+                dist = math.hypot(point.x - closest_x, point.y - closest_y)
             
             min_dist = min(min_dist, dist)
         
@@ -230,8 +412,7 @@ class SpatialAnalyzer:
         nearest_wall = self.find_nearest_wall(door.position)
         if not nearest_wall:
             # Fallback: use door rotation + 90 degrees
-            theta = math.radians(door.rotation + 90.0)
-            return (math.cos(theta), math.sin(theta))
+            return perpendicular_direction(door.rotation)
         
         # Get wall normal (perpendicular to wall)
         wall_normal = nearest_wall.get_normal()
@@ -257,9 +438,7 @@ class SpatialAnalyzer:
         
         # Fallback: use door rotation to estimate swing
         # Door typically opens perpendicular to its rotation
-        swing_angle = door.rotation + 90.0
-        theta = math.radians(swing_angle)
-        return (math.cos(theta), math.sin(theta))
+        return perpendicular_direction(door.rotation)
     
     def avoid_door_swing_zone(
         self,
@@ -268,10 +447,8 @@ class SpatialAnalyzer:
         clearance: float = 1000.0
     ) -> bool:
         """Check if point is in door swing zone."""
-        swing_zone = door.get_swing_zone(swing_radius=clearance)
-        
-        # Check if candidate point is inside swing zone polygon
-        # Simple check: distance to door position
+        # Simple check against the swing arc: distance to door position,
+        # then angle (the arc itself, door.get_swing_zone, isn't needed)
         dist_to_door = door.position.distance_to(candidate_point)
         if dist_to_door < clearance:
             # Check angle - if point is in swing arc
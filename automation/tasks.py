@@ -0,0 +1,56 @@
+"""
+Background tasks for plan processing.
+
+When Celery is installed and CELERY_BROKER_URL is configured, uploads are
+queued and processed by a worker so the HTTP request returns immediately.
+Otherwise processing runs synchronously, as in the original POC.
+"""
+
+from django.conf import settings
+from django.db import transaction
+
+from .models import ProcessedOutput, UploadedPlan
+from .services.processor import process_plan
+
+try:
+    from celery import shared_task
+    CELERY_AVAILABLE = True
+except ImportError:
+    CELERY_AVAILABLE = False
+
+
+def run_placement(plan_id: int, params: dict) -> None:
+    """
+    Process a stored plan by primary key.
+
+    `params` are the keyword arguments for `process_plan`, which takes care
+    of status transitions and the log on the ProcessedOutput row. Room
+    placement stays in-process: Celery prefork workers are daemonic and
+    cannot start a process pool.
+    """
+    plan = UploadedPlan.objects.get(pk=plan_id)
+    processed = ProcessedOutput.objects.get(plan=plan)
+    process_plan(plan, processed, parallel=False, **params)
+
+
+if CELERY_AVAILABLE:
+    run_placement = shared_task(run_placement)
+
+
+def dispatch_processing(
+    plan: UploadedPlan,
+    processed: ProcessedOutput,
+    **params,
+) -> ProcessedOutput:
+    """
+    Queue processing on a Celery worker if one is configured, otherwise run it now.
+
+    The task is sent after the surrounding transaction commits so the worker
+    always sees the newly created rows. In the queued case the returned
+    ProcessedOutput is still PENDING.
+    """
+    if CELERY_AVAILABLE and getattr(settings, "CELERY_BROKER_URL", ""):
+        transaction.on_commit(lambda: run_placement.delay(plan.pk, params))
+        return processed
+
+    return process_plan(plan, processed, **params)
@@ -1,3 +1,469 @@
-from django.test import TestCase
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock, skipUnless
+import hashlib
+import random
+import tempfile
+import threading
 
-# Create your tests here.
+from django.test import SimpleTestCase, TestCase, override_settings
+
+from . import tasks
+from .models import ProcessedOutput, UploadedPlan
+from .services import electrical_placer, geometry_parser, spatial_analyzer
+from .services.cad_adapters import detect_rooms_and_doors_from_dxf
+from .services.electrical_placer import ElectricalPlacer
+from .services.geometry_parser import (
+    CADGeometry, Door, GeometryParser, Point3D, Room, Wall, Window
+)
+from .services.placement_validator import Placement, PlacementValidator
+from .services.spatial_analyzer import SpatialAnalyzer
+
+
+def make_grid_geometry(cols: int = 4, rows: int = 4, size: float = 4000.0) -> CADGeometry:
+    """Square rooms on a grid, each with its four walls, a door and a window."""
+    geometry = CADGeometry()
+    for r in range(rows):
+        for c in range(cols):
+            x0, y0 = c * size, r * size
+            corners = [
+                Point3D(x0, y0), Point3D(x0 + size, y0),
+                Point3D(x0 + size, y0 + size), Point3D(x0, y0 + size),
+            ]
+            geometry.rooms.append(Room(vertices=corners, layer="ROOM"))
+            for i in range(4):
+                geometry.walls.append(Wall(corners[i], corners[(i + 1) % 4], layer="WALL"))
+            geometry.doors.append(Door(
+                position=Point3D(x0 + size / 2, y0),
+                rotation=0.0,
+                layer="DOOR",
+                block_name="DOOR",
+            ))
+            geometry.windows.append(Window(
+                position=Point3D(x0 + size / 4, y0 + size / 2),
+                rotation=0.0,
+                layer="WINDOW",
+                block_name="WINDOW",
+            ))
+    return geometry
+
+
+class PlaceRoomsPoolTests(SimpleTestCase):
+    def setUp(self):
+        self.placer = ElectricalPlacer(Path("unused.dxf"))
+        self.placer.geometry = make_grid_geometry()
+        self.placer.analyzer = SpatialAnalyzer(self.placer.geometry)
+        self.placer.initialize_placement_rules()
+        self.placer.PARALLEL_ROOM_THRESHOLD = 16
+        self.expected = self.placer._place_rooms(1, 1, True, None)
+
+    def test_pool_is_opt_in(self):
+        with mock.patch.object(electrical_placer.os, "cpu_count", return_value=4), \
+                mock.patch.object(electrical_placer, "ProcessPoolExecutor") as pool:
+            self.placer._place_rooms(1, 1, True, None)
+            self.placer.PARALLEL_ROOM_THRESHOLD = 17
+            self.placer._place_rooms(1, 1, True, None, parallel=True)
+        pool.assert_not_called()
+
+    def test_daemonic_process_skips_pool(self):
+        daemon = SimpleNamespace(daemon=True)
+        with mock.patch.object(electrical_placer.os, "cpu_count", return_value=4), \
+                mock.patch.object(electrical_placer.multiprocessing, "current_process", return_value=daemon), \
+                mock.patch.object(electrical_placer, "ProcessPoolExecutor") as pool:
+            result = self.placer._place_rooms(1, 1, True, None, parallel=True)
+        pool.assert_not_called()
+        self.assertEqual(result, self.expected)
+
+    def test_pool_startup_failure_falls_back_to_serial(self):
+        failing = mock.Mock(side_effect=AssertionError("daemonic processes are not allowed to have children"))
+        with mock.patch.object(electrical_placer.os, "cpu_count", return_value=4), \
+                mock.patch.object(electrical_placer, "ProcessPoolExecutor", failing), \
+                self.assertLogs(electrical_placer.logger, "WARNING"):
+            result = self.placer._place_rooms(1, 1, True, None, parallel=True)
+        failing.assert_called_once()
+        self.assertEqual(result, self.expected)
+
+    def test_unexpected_pool_errors_propagate(self):
+        failing = mock.Mock(side_effect=ValueError("bad task"))
+        with mock.patch.object(electrical_placer.os, "cpu_count", return_value=4), \
+                mock.patch.object(electrical_placer, "ProcessPoolExecutor", failing):
+            with self.assertRaises(ValueError):
+                self.placer._place_rooms(1, 1, True, None, parallel=True)
+
+
+class DispatchProcessingTests(TestCase):
+    def setUp(self):
+        self.plan = UploadedPlan.objects.create(name="plan", original_file="uploads/plan.dxf")
+        self.processed = ProcessedOutput.objects.create(plan=self.plan)
+        self.params = {"lights_per_room": 2, "sockets_enabled": False}
+
+    @override_settings(CELERY_BROKER_URL="memory://")
+    def test_with_broker_queues_task_after_commit(self):
+        with mock.patch.object(tasks, "CELERY_AVAILABLE", True), \
+                mock.patch.object(tasks, "run_placement") as task, \
+                mock.patch.object(tasks, "process_plan") as process_plan:
+            with self.captureOnCommitCallbacks() as callbacks:
+                result = tasks.dispatch_processing(self.plan, self.processed, **self.params)
+            task.delay.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        self.assertIs(result, self.processed)
+        task.delay.assert_called_once_with(self.plan.pk, self.params)
+        process_plan.assert_not_called()
+
+    @override_settings(CELERY_BROKER_URL="")
+    def test_without_broker_processes_inline(self):
+        with mock.patch.object(tasks, "run_placement") as task, \
+                mock.patch.object(tasks, "process_plan", return_value=self.processed) as process_plan:
+            result = tasks.dispatch_processing(self.plan, self.processed, **self.params)
+
+        self.assertIs(result, self.processed)
+        process_plan.assert_called_once_with(self.plan, self.processed, **self.params)
+        task.delay.assert_not_called()
+
+    def test_worker_disables_process_pool(self):
+        with mock.patch.object(tasks, "process_plan") as process_plan:
+            tasks.run_placement(self.plan.pk, self.params)
+
+        process_plan.assert_called_once_with(
+            self.plan, self.processed, parallel=False, **self.params
+        )
+
+
+def write_text_dxf(directory: str, entities: list[list[tuple[int, object]]]) -> Path:
+    """Write an ENTITIES-only ASCII DXF with right-aligned group codes."""
+    lines = ["  0", "SECTION", "  2", "ENTITIES"]
+    for entity in entities:
+        for code, value in entity:
+            lines.append(f"{code:>3}")
+            lines.append(str(value))
+    lines += ["  0", "ENDSEC", "  0", "EOF"]
+    path = Path(directory) / "plan.dxf"
+    path.write_text("\n".join(lines) + "\n")
+    return path
+
+
+def lwpolyline(layer: str, points: list[tuple[float, float]], closed: bool = True) -> list[tuple[int, object]]:
+    entity = [(0, "LWPOLYLINE"), (8, layer), (90, len(points)), (70, 1 if closed else 0)]
+    for x, y in points:
+        entity += [(10, x), (20, y)]
+    return entity
+
+
+class TextFallbackParserTests(SimpleTestCase):
+    """GeometryParser's text fallback, used when ezdxf cannot read a file."""
+
+    ENTITIES = [
+        lwpolyline("ROOM", [(0, 0), (4000, 0), (4000, 3000), (0, 3000)]),
+        lwpolyline("A-ROOM", [(5000, 0), (8000, 0), (8000, 3000), (5000, 3000)]),
+        # Open polyline on an unrelated layer is not a room
+        lwpolyline("FURNITURE", [(0, 0), (100, 0), (100, 100), (0, 100)], closed=False),
+        [(0, "LINE"), (8, "WALL"), (10, 0), (20, 0), (30, 0), (11, 4000), (21, 0), (31, 0)],
+        # Shorter than 100 mm: skipped
+        [(0, "LINE"), (8, "WALL"), (10, 0), (20, 0), (11, 50), (21, 0)],
+        [(0, "INSERT"), (8, "DOOR"), (2, "D1"), (10, 2000), (20, 0), (30, 0), (50, 90)],
+        [(0, "INSERT"), (8, "WINDOW"), (2, "W1"), (10, 0), (20, 1500)],
+        [(0, "TEXT"), (8, "ROOM"), (10, 1), (20, 1), (1, "Kitchen")],
+    ]
+
+    def parse(self, entities):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_text_dxf(directory, entities)
+            with mock.patch.object(geometry_parser, "EZDXF_AVAILABLE", False):
+                return GeometryParser(path).parse()
+
+    def test_fallback_parse_terminates(self):
+        # The line-based room parser used to spin forever on any file
+        result = {}
+        worker = threading.Thread(
+            target=lambda: result.setdefault("geometry", self.parse(self.ENTITIES)),
+            daemon=True,
+        )
+        worker.start()
+        worker.join(timeout=10)
+        self.assertFalse(worker.is_alive(), "text DXF fallback did not finish")
+        self.assertEqual(len(result["geometry"].rooms), 2)
+
+    def test_fallback_extracts_entities(self):
+        geometry = self.parse(self.ENTITIES)
+
+        self.assertEqual([room.layer for room in geometry.rooms], ["ROOM", "A-ROOM"])
+        self.assertEqual(
+            [(v.x, v.y) for v in geometry.rooms[0].vertices],
+            [(0, 0), (4000, 0), (4000, 3000), (0, 3000)],
+        )
+        self.assertEqual(geometry.rooms[0].get_area(), 12000000.0)
+        self.assertEqual(len(geometry.walls), 1)
+        self.assertEqual(geometry.walls[0].end, Point3D(4000.0, 0.0, 0.0))
+        self.assertEqual(len(geometry.doors), 1)
+        self.assertEqual(geometry.doors[0].position, Point3D(2000.0, 0.0, 0.0))
+        self.assertEqual(geometry.doors[0].rotation, 90.0)
+        self.assertEqual(geometry.doors[0].block_name, "D1")
+        self.assertEqual(len(geometry.windows), 1)
+        self.assertEqual(geometry.windows[0].position, Point3D(0.0, 1500.0, 0.0))
+        self.assertFalse(geometry.is_3d)
+
+    def test_fallback_detects_3d_entities(self):
+        face = [(0, "3DFACE"), (8, "0"), (10, 0), (20, 0), (30, 0), (11, 1), (21, 0), (31, 1)]
+        geometry = self.parse(self.ENTITIES + [face])
+        self.assertTrue(geometry.is_3d)
+        self.assertEqual(len(geometry.rooms), 2)
+
+
+class StreamingParser(GeometryParser):
+    STREAMING_MIN_BYTES = 0
+
+
+@skipUnless(geometry_parser.EZDXF_AVAILABLE, "ezdxf is not installed")
+class StreamedParseTests(SimpleTestCase):
+    """Large files are read through iterdxf in a single modelspace pass."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / "plan.dxf"
+
+    def write(self, with_3d=False):
+        doc = geometry_parser.ezdxf.new("R2010")
+        doc.blocks.new("DOOR_BLK")
+        doc.blocks.new("WIN_BLK")
+        msp = doc.modelspace()
+        for i in range(3):
+            x0 = i * 5000
+            corners = [(x0, 0), (x0 + 5000, 0), (x0 + 5000, 4000), (x0, 4000)]
+            msp.add_lwpolyline(corners, close=True, dxfattribs={"layer": "ROOM"})
+            msp.add_line((x0, 0), (x0 + 5000, 0), dxfattribs={"layer": "WALL"})
+            msp.add_blockref("DOOR_BLK", (x0 + 2500, 0), dxfattribs={"layer": "DOOR", "rotation": 90 * i})
+            msp.add_blockref("WIN_BLK", (x0, 2000), dxfattribs={"layer": "WINDOW"})
+        msp.add_lwpolyline([(0, 4000), (15000, 4000), (15000, 8000)], dxfattribs={"layer": "A-WALL"})
+        msp.add_polyline3d([(0, 8000, 0), (3000, 8000, 0), (3000, 11000, 0)], dxfattribs={"layer": "WALL"})
+        msp.add_circle((0, 0), 100)
+        msp.add_text("Kitchen", dxfattribs={"layer": "ROOM"})
+        if with_3d:
+            msp.add_3dface([(0, 0, 0), (1, 0, 0), (1, 1, 1)])
+        doc.saveas(self.path)
+
+    def assertSameAsReadfile(self):
+        expected = GeometryParser(self.path).parse()
+        with mock.patch.object(geometry_parser.iterdxf, "opendxf", wraps=geometry_parser.iterdxf.opendxf) as opendxf:
+            streamed = StreamingParser(self.path).parse()
+        opendxf.assert_called_once()
+        self.assertEqual(streamed, expected)
+        return streamed
+
+    def test_streamed_parse_matches_readfile(self):
+        self.write()
+        geometry = self.assertSameAsReadfile()
+        self.assertEqual(len(geometry.rooms), 3)
+        self.assertEqual(len(geometry.walls), 7)
+        self.assertEqual(len(geometry.doors), 3)
+        self.assertEqual(len(geometry.windows), 3)
+        self.assertFalse(geometry.is_3d)
+
+    def test_streamed_parse_detects_3d(self):
+        self.write(with_3d=True)
+        self.assertTrue(self.assertSameAsReadfile().is_3d)
+
+    def test_modelspace_is_read_once(self):
+        self.write()
+        opened = []
+        real_opendxf = geometry_parser.iterdxf.opendxf
+
+        def opendxf(*args, **kwargs):
+            doc = real_opendxf(*args, **kwargs)
+            real_modelspace = doc.modelspace
+            doc.modelspace = lambda **kw: opened.append(kw) or real_modelspace(**kw)
+            return doc
+
+        with mock.patch.object(geometry_parser.iterdxf, "opendxf", opendxf):
+            StreamingParser(self.path).parse()
+        self.assertEqual(len(opened), 1)
+
+
+class DetectRoomsAndDoorsTests(SimpleTestCase):
+    """The byte-level room/door counter in cad_adapters."""
+
+    def count(self, entities):
+        with tempfile.TemporaryDirectory() as directory:
+            return detect_rooms_and_doors_from_dxf(write_text_dxf(directory, entities))
+
+    def test_counts_room_polylines_and_door_inserts(self):
+        entities = [
+            lwpolyline("ROOM", [(0, 0), (1, 0), (1, 1)]),
+            lwpolyline("WALL", [(0, 0), (1, 0), (1, 1)]),
+            [(0, "INSERT"), (8, "DOOR"), (2, "D1")],
+            [(0, "INSERT"), (8, "WINDOW"), (2, "W1")],
+            # The entity name as some other group's value is not a header
+            [(0, "TEXT"), (8, "ROOM"), (1, "LWPOLYLINE")],
+        ]
+        self.assertEqual(self.count(entities), (1, 1))
+
+    def test_padded_entity_names_are_counted(self):
+        padded = lwpolyline("ROOM", [(0, 0), (1, 0), (1, 1)])
+        padded[0] = (0, "  LWPOLYLINE ")
+        entities = [
+            padded,
+            lwpolyline("ROOM", [(0, 0), (1, 0), (1, 1)]),
+            [(0, "INSERT"), (8, "DOOR"), (2, "D1")],
+            [(0, "\tINSERT"), (8, "DOOR"), (2, "D2")],
+        ]
+        self.assertEqual(self.count(entities), (2, 2))
+
+
+class AllPairsValidator(PlacementValidator):
+    """Reference validator that checks every accepted placement."""
+
+    def _nearby_placements(self, point):
+        return list(self.placements)
+
+
+class PlacementValidatorGridTests(SimpleTestCase):
+    TYPES = ("SWITCH", "LIGHT", "FAN", "SOCKET")
+
+    def assertSameAsAllPairs(self, placements):
+        expected = AllPairsValidator().validate_all(placements)
+        self.assertEqual(PlacementValidator().validate_all(placements), expected)
+        return expected
+
+    def test_exact_clearance_across_cell_edges(self):
+        cell = PlacementValidator()._cell_size
+        placements = []
+        for component, clearance in (
+            ("FAN", PlacementValidator.MIN_CLEARANCE_FAN_FAN),
+            ("LIGHT", PlacementValidator.MIN_CLEARANCE_LIGHT_LIGHT),
+        ):
+            for x0, y0 in ((0.0, 0.0), (-cell, 3 * cell), (cell - 1e-9, -cell)):
+                # Exactly at clearance is allowed, just inside it is not
+                for dx, dy in ((clearance, 0.0), (0.0, -clearance), (clearance, clearance)):
+                    placements += [
+                        Placement(Point3D(x0, y0), component),
+                        Placement(Point3D(x0 + dx, y0 + dy), component),
+                        Placement(Point3D(x0 + dx - 1e-6, y0 + dy), component),
+                    ]
+        results = self.assertSameAsAllPairs(placements)
+        self.assertTrue(any(result.is_valid for result in results[1:]))
+        self.assertTrue(any(not result.is_valid for result in results))
+
+    def test_random_placements_match_all_pairs(self):
+        rnd = random.Random(1234)
+        for _ in range(50):
+            # Coarse coordinates put many pairs exactly at a clearance or cell edge
+            placements = [
+                Placement(
+                    Point3D(rnd.randrange(-30, 30) * 100.0, rnd.randrange(-30, 30) * 100.0),
+                    rnd.choice(self.TYPES),
+                )
+                for _ in range(rnd.randint(1, 120))
+            ]
+            self.assertSameAsAllPairs(placements)
+
+
+class PlacementMetadataTests(SimpleTestCase):
+    def test_shared_metadata_is_read_only(self):
+        placer = ElectricalPlacer(Path("unused.dxf"))
+        placer.geometry = make_grid_geometry(cols=1, rows=1)
+        placer.analyzer = SpatialAnalyzer(placer.geometry)
+        placer.initialize_placement_rules()
+        placements = placer.place_components()
+        sockets = [p for p in placements if p.component_type == "SOCKET"]
+
+        self.assertGreater(len(sockets), 1)
+        self.assertIs(sockets[0].metadata, sockets[1].metadata)
+        self.assertEqual(sockets[0].metadata["rule"], "along_walls_standard_spacing")
+        for placement in placements:
+            with self.assertRaises(TypeError):
+                placement.metadata["rule"] = "changed"
+
+
+class GeometryCacheTests(SimpleTestCase):
+    def setUp(self):
+        electrical_placer._geometry_cache.clear()
+        self.addCleanup(electrical_placer._geometry_cache.clear)
+
+    def test_cache_keyed_by_file_contents(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_text_dxf(directory, TextFallbackParserTests.ENTITIES)
+            expected_key = hashlib.blake2b(path.read_bytes()).hexdigest()
+            with mock.patch.object(geometry_parser, "EZDXF_AVAILABLE", False):
+                placer = ElectricalPlacer(path)
+                geometry = placer.parse_geometry()
+                placer.analyze_spatial()
+
+                again = ElectricalPlacer(path)
+                self.assertIs(again.parse_geometry(), geometry)
+
+        self.assertEqual(placer._cache_key, expected_key)
+        self.assertEqual(again._cache_key, expected_key)
+
+    def test_cached_analyzer_is_frozen(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_text_dxf(directory, TextFallbackParserTests.ENTITIES)
+            with mock.patch.object(geometry_parser, "EZDXF_AVAILABLE", False):
+                placer = ElectricalPlacer(path)
+                placer.parse_geometry()
+                analyzer = placer.analyze_spatial()
+
+        rooms = placer.geometry.rooms
+        self.assertIsNotNone(analyzer._door_to_room)
+        self.assertEqual(len(analyzer._doors_by_room), len(rooms))
+        self.assertEqual(len(analyzer._windows_by_room), len(rooms))
+
+        # Lookups outside the geometry are answered but not cached
+        caches = (dict(analyzer._doors_by_room), dict(analyzer._windows_by_room))
+        temporary = Room(vertices=list(rooms[0].vertices), layer="ROOM")
+        self.assertEqual(analyzer.find_doors_for_room(temporary), analyzer.find_doors_for_room(rooms[0]))
+        self.assertEqual(analyzer.find_windows_for_room(temporary), analyzer.find_windows_for_room(rooms[0]))
+        self.assertEqual((analyzer._doors_by_room, analyzer._windows_by_room), caches)
+
+    def test_frozen_analyzer_builds_indexes(self):
+        geometry = make_grid_geometry(cols=8, rows=8)
+        analyzer = SpatialAnalyzer(geometry)
+        analyzer.freeze()
+        if spatial_analyzer.SHAPELY_AVAILABLE:
+            self.assertIsNotNone(analyzer._room_tree)
+            self.assertIsNotNone(analyzer._wall_tree)
+        lazy = SpatialAnalyzer(geometry)
+        for door in geometry.doors:
+            self.assertIs(analyzer.find_room_for_door(door), lazy.find_room_for_door(door))
+        for room in geometry.rooms:
+            self.assertEqual(analyzer.find_doors_for_room(room), lazy.find_doors_for_room(room))
+
+
+class SpatialAnalyzerCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.geometry = make_grid_geometry()
+        self.analyzer = SpatialAnalyzer(self.geometry)
+
+    def temporary_rooms(self):
+        """Rooms over each grid cell, built on demand and dropped right after use."""
+        for source in self.geometry.rooms:
+            yield Room(vertices=list(source.vertices), layer="TEMP")
+
+    def test_doors_for_temporary_rooms(self):
+        expected = [
+            SpatialAnalyzer(self.geometry).find_doors_for_room(room)
+            for room in self.geometry.rooms
+        ]
+        # Each temporary Room is freed before the next is built, so ids are reused
+        found = [self.analyzer.find_doors_for_room(room) for room in self.temporary_rooms()]
+        self.assertEqual(found, expected)
+
+    def test_windows_for_temporary_rooms(self):
+        expected = [
+            SpatialAnalyzer(self.geometry).find_windows_for_room(room)
+            for room in self.geometry.rooms
+        ]
+        found = [self.analyzer.find_windows_for_room(room) for room in self.temporary_rooms()]
+        self.assertEqual(found, expected)
+        self.assertTrue(all(len(windows) == 1 for windows in found))
+
+    def test_room_for_door_ignores_foreign_doors(self):
+        for door in self.geometry.doors:
+            self.assertIsNotNone(self.analyzer.find_room_for_door(door))
+        # Once the mapped doors are gone, new Door objects may reuse their ids
+        positions = [door.position for door in self.geometry.doors]
+        self.geometry.doors = []
+        for position in positions:
+            door = Door(position, 0.0, "DOOR", "DOOR")
+            self.assertIsNone(self.analyzer.find_room_for_door(door))
@@ -6,7 +6,7 @@ from django.urls import reverse
 from django.views import View
 
 from .models import ProcessedOutput, UploadedPlan
-from .services.processor import process_plan
+from .tasks import dispatch_processing
 
 
 def upload_view(request: HttpRequest) -> HttpResponse:
@@ -61,8 +61,8 @@ def upload_view(request: HttpRequest) -> HttpResponse:
         plan = UploadedPlan.objects.create(name=name, original_file=uploaded_file)
         processed = ProcessedOutput.objects.create(plan=plan)
 
-        # For POC we run synchronously; later this can be moved to a background worker.
-        process_plan(
+        # Runs on a Celery worker when a broker is configured, otherwise inline.
+        dispatch_processing(
             plan,
             processed,
             lights_per_room=lights_per_room,
@@ -141,7 +141,8 @@ class AutomationRunAPI(View):
     Simple JSON API endpoint for running automation.
 
     Accepts the same form fields as the upload page and returns
-    plan/processed IDs and status once processing completes.
+    plan/processed IDs and status once processing completes (or with
+    status PENDING when processing is queued on a Celery worker).
     """
 
     def post(self, request: HttpRequest) -> JsonResponse:
@@ -165,9 +166,6 @@ class AutomationRunAPI(View):
             except (TypeError, ValueError):
                 return default
 
-        from .models import ProcessedOutput, UploadedPlan
-        from .services.processor import process_plan
-
         lights_per_room = _as_int(request.POST.get("lights_per_room"), 1)
         switches_per_door = _as_int(request.POST.get("switches_per_door"), 1)
         fans_per_room = 0
@@ -188,7 +186,7 @@ class AutomationRunAPI(View):
         plan = UploadedPlan.objects.create(name=name, original_file=uploaded_file)
         processed = ProcessedOutput.objects.create(plan=plan)
 
-        process_plan(
+        dispatch_processing(
             plan,
             processed,
             lights_per_room=lights_per_room,
@@ -0,0 +1,7 @@
+try:
+    # Load the Celery app so @shared_task binds to it when Django starts.
+    from .celery import app as celery_app
+except ImportError:  # Celery is optional; processing then runs in-process.
+    celery_app = None
+
+__all__ = ("celery_app",)
@@ -0,0 +1,20 @@
+"""
+Celery application for revit_autocad_poc.
+
+Workers are started with:
+
+    celery -A revit_autocad_poc worker -l info
+
+and are only used when CELERY_BROKER_URL is configured; otherwise plans
+are processed in-process by the web request.
+"""
+
+import os
+
+from celery import Celery
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'revit_autocad_poc.settings')
+
+app = Celery('revit_autocad_poc')
+app.config_from_object('django.conf:settings', namespace='CELERY')
+app.autodiscover_tasks()